@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -60,7 +63,8 @@ ROOT_URLCONF = 'attendance_system.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for the request metrics
+        'BACKEND': 'core.metrics.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,11 +84,43 @@ WSGI_APPLICATION = 'attendance_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Database profile, chosen with the DATABASE_PROFILE environment variable:
+#   basic      - Django's SQLite defaults: rollback journal, a 5 s wait for
+#                the write lock, a connection per request
+#   production - for several workers and lecture halls scanning at once
+#                (see core/backends/sqlite3): WAL journaling, so reads and
+#                the writer do not block each other; a 20 s wait for the
+#                write lock; write transactions that take the lock when they
+#                begin; connections kept for DATABASE_CONN_MAX_AGE seconds
+#                (always 0 under ASGI, see settings_asgi.py)
+# synchronous = NORMAL is safe with WAL: a power cut can lose the last
+# commits but never corrupts the database.
+# `python manage.py stress_scans` compares the profiles under concurrent scanners.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'production')
+DATABASE_PROFILES = {
+    'basic': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'production': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL',
+        },
+    },
+}
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(
+        f'DATABASE_PROFILE must be one of {", ".join(DATABASE_PROFILES)}, not {DATABASE_PROFILE!r}'
+    )
+# A copy, so that test databases renaming it leave the profile as it was.
+DATABASES = {
+    'default': dict(DATABASE_PROFILES[DATABASE_PROFILE]),
 }
 
 
@@ -165,3 +201,129 @@ LOGOUT_REDIRECT_URL = '/'
 # Session Settings
 SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+
+# Session storage, chosen with the SESSION_MODE environment variable:
+#   db        - the django_session table (Django's default)
+#   cached_db - sessions read from the 'sessions' cache, with every write also
+#               going to the table (see core/sessions.py); for login bursts
+# SESSION_CACHE picks that cache: 'memory' is per process, so with several
+# workers a logout reaches the others once their copy expires after
+# SESSION_CACHE_TTL seconds; 'file' is shared by every worker on the host.
+# Run `python manage.py prune_sessions` from cron to delete expired rows.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_CACHE = os.environ.get('SESSION_CACHE', 'memory')
+SESSION_CACHE_TTL = 300
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'core.sessions',
+}
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f'SESSION_MODE must be one of {", ".join(SESSION_ENGINES)}, not {SESSION_MODE!r}')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHES = {
+    'memory': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SESSION_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'sessions')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if SESSION_CACHE not in SESSION_CACHES:
+    raise ImproperlyConfigured(f'SESSION_CACHE must be one of {", ".join(SESSION_CACHES)}, not {SESSION_CACHE!r}')
+
+# The default cache holds state every worker process must agree on: the
+# dashboard totals (core/counters.py), the lecturer login names that matched
+# nobody (core/logins.py) and the timetable generation (core/timetables.py).
+# CACHE picks it:
+#   file   - shared by every worker on the host, under CACHE_DIR (the default)
+#   redis  - shared by every host, at CACHE_REDIS_URL (needs the redis package)
+#   memory - per process; only for a single worker process, such as runserver
+CACHE = os.environ.get('CACHE', 'file')
+DEFAULT_CACHES = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'default')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379'),
+    },
+    'memory': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if CACHE not in DEFAULT_CACHES:
+    raise ImproperlyConfigured(f'CACHE must be one of {", ".join(DEFAULT_CACHES)}, not {CACHE!r}')
+
+CACHES = {
+    'default': DEFAULT_CACHES[CACHE],
+    'sessions': SESSION_CACHES[SESSION_CACHE],
+}
+
+# Mark-attendance posts a status and a notes field per student, so large
+# lecture rosters need more than Django's default of 1000 fields.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 20000
+
+# QR scan roster index (see core/roster.py)
+ROSTER_INDEX_MAX_COURSES = 128  # courses kept per worker process
+ROSTER_INDEX_TTL = 300  # seconds before a roster is rebuilt
+
+# Cached dashboard totals (see core/counters.py)
+COUNTERS_TTL = 3600  # seconds before a total is recounted
+
+# Scan writes (see core/journal.py), chosen with the SCAN_WRITE_MODE
+# environment variable:
+#   direct  - each scan is written to the database before it is answered
+#   journal - each scan is appended to a local journal in SCAN_JOURNAL_DIR
+#             and answered once that is on disk; run
+#             `python manage.py flush_scan_journal` beside the server to
+#             write the journal to the database in batches
+SCAN_WRITE_MODE = os.environ.get('SCAN_WRITE_MODE', 'direct')
+SCAN_JOURNAL_DIR = os.environ.get('SCAN_JOURNAL_DIR', os.path.join(BASE_DIR, 'journal'))
+
+# Attendance archival (see core/archive.py): days of attendance kept in the
+# hot table when archive_attendance runs without --before.
+ATTENDANCE_HOT_DAYS = 180
+
+# Cached weekly timetables (see core/timetables.py)
+TIMETABLE_CACHE_TTL = 3600  # seconds before a cached week is rebuilt
+
+# Worker processes rendering QR ID cards for the card export (see core/cards.py).
+# They are started on the first export and shared by later ones; 1 renders in
+# the request thread.
+QR_CARD_WORKERS = os.cpu_count() or 1
+
+# Classroom photo scanning (see core/photos.py): processes decoding uploaded
+# photos (1 decodes in the request thread) and the largest photo accepted.
+QR_PHOTO_WORKERS = os.cpu_count() or 1
+QR_PHOTO_MAX_BYTES = 15 * 1024 * 1024
+
+# Request metrics (see core/metrics.py, served at /metrics/). Every request's
+# latency is recorded; this share of requests also gets query count, DB time
+# and template time. Lower it (e.g. 0.05) on busy servers.
+METRICS_SAMPLE_RATE = 1.0
+# Token a Prometheus scraper sends as "Authorization: Bearer <token>" to read
+# /metrics/ without logging in; unset, only logged-in admins can read it.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Seconds a lecturer login name that matched nobody is remembered (see core/logins.py)
+LECTURER_LOGIN_MISS_TTL = 300
+
+# Live attendance feed (see core/events.py). The local broker only relays
+# writes made by the same process; point this at a shared broker when
+# running several workers.
+ATTENDANCE_EVENTS_BROKER = 'core.events.LocalBroker'
+ATTENDANCE_EVENTS_BACKLOG = 1000  # events kept per course and day for resuming clients
+ATTENDANCE_EVENTS_STREAM_MAX_AGE = 300  # seconds before a stream closes and the client reconnects
+
+# Exam eligibility (see core/eligibility.py): the attendance percentage a
+# student needs in a course, and whether arriving late counts as attending.
+ELIGIBILITY_THRESHOLD = 75
+ELIGIBILITY_COUNT_LATE = True
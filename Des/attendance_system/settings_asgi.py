@@ -0,0 +1,11 @@
+"""
+Django settings for serving attendance_system under ASGI (see asgi.py).
+
+Everything else comes from settings.py.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# Under ASGI each request's queries run on a different thread, so kept
+# connections are never reused and pile up; close them after each request.
+DATABASES['default']['CONN_MAX_AGE'] = 0
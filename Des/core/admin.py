@@ -66,6 +66,21 @@ class AttendanceAdmin(admin.ModelAdmin):
     ordering = ('-date', 'course__code')
     readonly_fields = ('marked_at',)
 
+@admin.register(ArchivedAttendance)
+class ArchivedAttendanceAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'date', 'status', 'marked_by', 'marked_at')
+    list_filter = ('status', 'course__department', 'course__level')
+    search_fields = ('student__matric_number', 'course__code')
+    ordering = ('-date', 'course__code')
+    date_hierarchy = 'date'
+    
+    # Archived rows are moved back by core.archive before they change.
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Admin)
 class AdminAdmin(admin.ModelAdmin):
     list_display = ('user', 'admin_id', 'role')
@@ -0,0 +1,144 @@
+"""Archival of past semesters' attendance.
+
+``archive_attendance`` moves the ``Attendance`` rows dated before a cutoff
+into ``ArchivedAttendance`` in chunks, one ``INSERT ... SELECT`` and one
+``DELETE`` per chunk in a transaction, so the hot table, and every index and
+admin changelist over it, only holds the current term. Run it from cron at
+the start of a term (``manage.py archive_attendance``).
+
+Moved rows keep their id, and ``AttendanceSummary`` counts both tables, so
+report totals and dashboard counters do not change. Reads that can reach
+back before the newest archived date (``attendance_models``) query both
+tables and merge the results; reads confined to the current term never
+touch the archive.
+
+Writing to a day that has been archived first moves that course's day back
+(``restore_archived``), so a (student, course, date) only ever lives in one
+of the two tables.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, ArchivedAttendance
+
+# Rows of attendance kept in the hot table by default, in days back from today.
+ATTENDANCE_HOT_DAYS = getattr(settings, 'ATTENDANCE_HOT_DAYS', 180)
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+COLUMNS = [field.column for field in Attendance._meta.concrete_fields]
+
+
+def default_cutoff():
+    return date.today() - timedelta(days=ATTENDANCE_HOT_DAYS)
+
+
+def newest_archived_date():
+    """The latest date in the archive (one index lookup), or None when it is empty."""
+    return ArchivedAttendance.objects.order_by('-date').values_list('date', flat=True).first()
+
+
+def reaches_archive(date_from, newest):
+    """Whether reading from ``date_from`` (a date, an ISO string or None for all time) needs the archive."""
+    if newest is None:
+        return False
+    if isinstance(date_from, str):
+        date_from = parse_date(date_from)
+    return date_from is None or date_from <= newest
+
+
+def attendance_models(date_from=None):
+    """The models to read attendance on or after ``date_from`` from: ``Attendance``, and the archive when it reaches that far."""
+    if reaches_archive(date_from, newest_archived_date()):
+        return [Attendance, ArchivedAttendance]
+    return [Attendance]
+
+
+def attendance_page(paginator, build, date_from=None, cursor=None):
+    """``paginator.page`` over the attendance of both tables.
+
+    ``build(model)`` returns the filtered queryset of one table and the
+    paginator's ordering must start with ``-date``. The archive is only
+    queried when the requested range reaches it and the current term does
+    not fill the page on its own.
+    """
+    hot = paginator.page(build(Attendance), cursor)
+    newest = newest_archived_date()
+    if not reaches_archive(date_from, newest):
+        return hot
+    rows, next_cursor = hot
+    # Every archived row sorts after a full page of newer rows.
+    if next_cursor and rows[-1].date > newest:
+        return hot
+    return paginator.page_merged([build(Attendance), build(ArchivedAttendance)], cursor)
+
+
+def _move_sql(source, target, where):
+    columns = ', '.join(connection.ops.quote_name(column) for column in COLUMNS)
+    source_table = connection.ops.quote_name(source._meta.db_table)
+    return (
+        f'INSERT INTO {connection.ops.quote_name(target._meta.db_table)} ({columns}) '
+        f'SELECT {columns} FROM {source_table} WHERE {where}',
+        f'DELETE FROM {source_table} WHERE {where}',
+    )
+
+
+def archive_attendance(before, chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+    """Move every attendance row dated before ``before`` into the archive; returns the number moved.
+
+    Chunks are ranges of ids, so each statement walks the primary key
+    instead of sorting, and every chunk commits on its own: an interrupted
+    run leaves nothing half moved and can simply be run again.
+    ``progress(moved)`` is called after each chunk.
+    """
+    if before > date.today():
+        raise ValueError('The cutoff cannot be in the future')
+    old = Attendance.objects.filter(date__lt=before).order_by('id').values_list('id', flat=True)
+    date_column = connection.ops.quote_name(Attendance._meta.get_field('date').column)
+    id_column = connection.ops.quote_name(Attendance._meta.pk.column)
+    insert, delete = _move_sql(
+        Attendance, ArchivedAttendance, f'{date_column} < %s AND {id_column} > %s AND {id_column} <= %s'
+    )
+    moved = 0
+    last_id = 0
+    while True:
+        upper = next(iter(old.filter(id__gt=last_id)[chunk_size - 1:chunk_size]), None)
+        if upper is None:
+            upper = old.filter(id__gt=last_id).aggregate(last=Max('id'))['last']
+            if upper is None:
+                return moved
+        params = [before, last_id, upper]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(insert, params)
+            moved += cursor.rowcount
+            cursor.execute(delete, params)
+        last_id = upper
+        if progress:
+            progress(moved)
+
+
+def restore_archived(course_id, day):
+    """Move one course's archived attendance for ``day`` back into ``Attendance``; returns the rows moved."""
+    course_column = connection.ops.quote_name(Attendance._meta.get_field('course').column)
+    date_column = connection.ops.quote_name(Attendance._meta.get_field('date').column)
+    insert, delete = _move_sql(ArchivedAttendance, Attendance, f'{course_column} = %s AND {date_column} = %s')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(insert, [course_id, day])
+        restored = cursor.rowcount
+        if restored:
+            cursor.execute(delete, [course_id, day])
+    return restored
+
+
+def restore_before_write(course_id, day):
+    """``restore_archived`` when ``day`` may be archived; today's writes never need it."""
+    if isinstance(day, str):
+        day = parse_date(day)
+    if day < date.today():
+        newest = newest_archived_date()
+        if newest is not None and day <= newest:
+            restore_archived(course_id, day)
@@ -0,0 +1,111 @@
+from datetime import date
+
+from django.db import transaction
+
+from .archive import restore_before_write
+from .counters import increment_on_commit
+from .events import publish_attendance_on_commit
+from .models import Attendance
+from .summary import refresh_summary
+
+# Upper bound on scans accepted in one batch request.
+MAX_SCAN_BATCH = 500
+
+
+def upsert_attendance(course_id, attendance_date, marked_by_id, entries, update_fields=('status', 'notes')):
+    """Insert or update attendance for one course and date as a set.
+
+    ``entries`` is an iterable of ``(student_id, status, notes)`` tuples. New
+    rows are inserted and existing ones (matched on the unique
+    student/course/date key) only have ``update_fields`` rewritten, so the
+    whole roster is written with bulk statements instead of a
+    ``get_or_create`` per student.
+    """
+    rows = [
+        Attendance(
+            student_id=student_id,
+            course_id=course_id,
+            date=attendance_date,
+            status=status,
+            marked_by_id=marked_by_id,
+            notes=notes,
+        )
+        for student_id, status, notes in entries
+    ]
+    if not rows:
+        return 0
+
+    # A day of a past semester is moved back out of the archive first.
+    restore_before_write(course_id, attendance_date)
+
+    # The transaction writes before it reads: on SQLite a transaction that
+    # reads first cannot wait for the write lock, it fails at once when
+    # another writer holds it.
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['student', 'course', 'date'],
+            update_fields=list(update_fields),
+        )
+        added = refresh_summary(course_id, attendance_date)
+        # bulk_create sends no signals, so the dashboard total is bumped here.
+        increment_on_commit('attendance', added)
+        publish_attendance_on_commit(course_id, attendance_date, [(row.student_id, row.status) for row in rows])
+    return len(rows)
+
+
+def parse_qr_data(qr_data):
+    """Return ``(student_id, matric_number)`` for a scanned payload, or None.
+
+    Payloads have the format ``STUDENT:STUDENT_ID:MATRIC_NUMBER``.
+    """
+    if isinstance(qr_data, str) and qr_data.startswith('STUDENT:'):
+        parts = qr_data.split(':')
+        if len(parts) >= 3:
+            return parts[1], parts[2]
+    return None
+
+
+def resolve_scans(roster, payloads):
+    """Resolve ``payloads`` against the in-memory ``roster`` (see ``core.roster``).
+
+    Returns one result dict per payload, in order, shaped like the
+    single-scan JSON response, and the ``upsert_attendance`` entries of the
+    students found, one per student.
+    """
+    results = []
+    entries = {}
+    for qr_data in payloads:
+        scan = parse_qr_data(qr_data)
+        if scan is None:
+            results.append({'success': False, 'message': 'Invalid QR code format'})
+            continue
+
+        student = roster.lookup(*scan)
+        if student is None:
+            results.append({'success': False, 'message': 'Student not found or not enrolled in this course'})
+            continue
+
+        entries[student.pk] = (student.pk, 'present', None)
+        results.append({
+            'success': True,
+            'message': f'Attendance marked for {student.full_name}',
+            'student_name': student.full_name,
+            'matric_number': student.matric_number,
+        })
+    return results, list(entries.values())
+
+
+def record_scans(roster, marked_by_id, payloads, attendance_date=None):
+    """Mark every valid scan in ``payloads`` present for the roster's course.
+
+    All rows are written with one bulk upsert. Returns the results of
+    ``resolve_scans``.
+    """
+    results, entries = resolve_scans(roster, payloads)
+    # Rescanning only flips the status; notes and marked_by are kept.
+    upsert_attendance(
+        roster.course_id, attendance_date or date.today(), marked_by_id, entries, update_fields=('status',)
+    )
+    return results
@@ -0,0 +1,40 @@
+"""SQLite backend for several writers (the ``production`` database profile).
+
+Adds two connection options of newer Django versions to the 4.2 backend:
+
+``init_command``
+    Statements, separated by ``;``, run on every new connection. The
+    profile uses them to enable WAL journaling, so readers never wait for
+    the writer or the writer for readers.
+
+``transaction_mode``
+    ``'IMMEDIATE'`` opens every ``atomic`` block with ``BEGIN IMMEDIATE``,
+    taking the write lock at the start. A deferred transaction that has
+    already read cannot wait for the lock when another connection holds it:
+    SQLite fails it at once with "database is locked" regardless of the
+    busy timeout. An immediate one waits up to the ``timeout`` option.
+
+Both options keep their names in Django 5.1, where this backend can be
+replaced by ``django.db.backends.sqlite3`` without changing ``OPTIONS``.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Not sqlite3.connect() arguments.
+        kwargs.pop('init_command', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in self.settings_dict['OPTIONS'].get('init_command', '').split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
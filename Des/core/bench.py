@@ -0,0 +1,159 @@
+"""Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the configured database: every run happens inside a
+throwaway test database that is created on entry and destroyed on exit.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .models import User, Department, Level, Student, Lecturer, Course
+
+
+@contextmanager
+def temporary_database(verbosity=0, name=None):
+    """Create a fresh, migrated test database for the duration of the block.
+
+    ``name`` puts the database in that file instead of the backend's default
+    (in memory for SQLite), so that concurrent threads share it the way
+    workers share a deployed database.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name:
+        test_settings['NAME'] = name
+    try:
+        old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+    finally:
+        test_settings['NAME'] = old_test_name
+
+
+def bench_client(user=None):
+    """Return a test client (optionally logged in) that passes ALLOWED_HOSTS."""
+    client = Client(SERVER_NAME='localhost')
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def wsgi_request(handler, method, path, cookie='', body=b'', content_type=''):
+    """Send one request straight to a ``WSGIHandler``, as a threaded WSGI server would.
+
+    ``path`` may carry a query string. Returns ``(status code, headers,
+    content)``, with headers as a list of ``(name, value)`` pairs.
+    """
+    path, _, query_string = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_COOKIE': cookie,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'REMOTE_ADDR': '127.0.0.1',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': BytesIO(),
+    }
+    started = []
+    response = handler(environ, lambda status, headers, exc_info=None: started.append((status, headers)))
+    try:
+        content = b''.join(response)
+    finally:
+        response.close()
+    status, headers = started[0]
+    return int(status.split(' ', 1)[0]), headers, content
+
+
+@contextmanager
+def measure():
+    """Capture wall time and query count for the block.
+
+    Yields a dict that is filled in with ``ms`` and ``queries`` on exit.
+    """
+    result = {}
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield result
+        result['ms'] = (time.perf_counter() - start) * 1000
+    result['queries'] = len(queries.captured_queries)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def median(samples):
+    return statistics.median(samples) if samples else 0.0
+
+
+def create_cohort(size, label, password='bench123'):
+    """Create a department, level, lecturer, course and ``size`` students.
+
+    Users and students are bulk inserted with one shared password hash, so
+    setting up a large roster costs a handful of statements.
+    """
+    department = Department.objects.create(name=f'Bench {label}', code=f'B{label}'[:10])
+    level_number = 900 + Level.objects.count()
+    level = Level.objects.create(name=f'Bench {label}', level_number=level_number)
+    password_hash = make_password(password)
+
+    lecturer_user = User.objects.create(
+        username=f'lecturer.{label}@bench.edu',
+        email=f'lecturer.{label}@bench.edu',
+        first_name='Bench',
+        last_name=f'Lecturer {label}',
+        user_type='lecturer',
+        password=password_hash,
+    )
+    lecturer = Lecturer.objects.create(user=lecturer_user, employee_id=f'BEMP{label}', department=department)
+    course = Course.objects.create(
+        title=f'Bench Course {label}',
+        code=f'BC{label}',
+        department=department,
+        level=level,
+        lecturer=lecturer,
+    )
+
+    users = User.objects.bulk_create([
+        User(
+            username=f'student{i}.{label}@bench.edu',
+            email=f'student{i}.{label}@bench.edu',
+            first_name='Student',
+            last_name=str(i),
+            user_type='student',
+            password=password_hash,
+        )
+        for i in range(size)
+    ], batch_size=500)
+    prefix = f'B{chr(ord("A") + level_number % 26)}'
+    Student.objects.bulk_create([
+        Student(
+            user=user,
+            matric_number=f'{prefix}/{level_number % 100:02d}/{i:04d}',
+            student_id=f'STB{label}-{i}'[:20],
+            department=department,
+            level=level,
+        )
+        for i, user in enumerate(users)
+    ], batch_size=500)
+    return course
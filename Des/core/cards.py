@@ -0,0 +1,196 @@
+"""Printable QR ID cards for a department and level, streamed as they render.
+
+Cards are rendered by the pure functions of ``core.qr`` in a pool of worker
+processes, a batch of students per task. Only ``QR_CARD_WORKERS * 2`` batches
+are in flight at once, and each result is written to the response as soon
+as it is its turn. Memory use therefore does not depend on the size of the
+intake, and the first sheet reaches the client while later ones are still
+being drawn.
+
+Two formats are produced:
+
+* ``pdf``: A4 sheets of ten cards, ready to print and cut. ``PdfSheets``
+  writes each page as it arrives and the page tree and cross-reference
+  table at the end, which PDF allows.
+* ``zip``: one PNG per card, named after the matric number, for card
+  printers. It is written through the same unseekable sink as the XLSX
+  export.
+"""
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .exports import StreamSink
+from .qr import SHEET_SIZE, CARDS_PER_SHEET, render_card_pngs, render_card_sheet
+
+CARD_FORMATS = ('pdf', 'zip')
+
+QR_CARD_WORKERS = getattr(settings, 'QR_CARD_WORKERS', os.cpu_count() or 1)
+
+# Cards per task of the zip export; a PDF task is one sheet.
+ZIP_BATCH_SIZE = 25
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def card_pool():
+    """The worker processes shared by every export of this process, or None to render in-process.
+
+    Workers are spawned rather than forked: forking a threaded server can
+    copy locks held by other request threads. The rendering functions only
+    need Pillow and qrcode, not Django.
+    """
+    global _pool
+    if QR_CARD_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=QR_CARD_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def render_batches(function, batches):
+    """Yield ``function(batch)`` for each batch, in order, with a bounded number in flight."""
+    pool = card_pool()
+    if pool is None:
+        yield from map(function, batches)
+        return
+    pending = deque()
+    try:
+        for batch in batches:
+            pending.append(pool.submit(function, batch))
+            if len(pending) >= QR_CARD_WORKERS * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # The client went away: drop the batches that have not started.
+        for future in pending:
+            future.cancel()
+
+
+def card_rows(students):
+    """``(student_id, matric_number, name, department, level_number)`` per student, by matric number."""
+    rows = students.order_by('matric_number').values_list(
+        'student_id', 'matric_number', 'user__first_name', 'user__last_name', 'department__name', 'level__level_number'
+    )
+    for student_id, matric_number, first_name, last_name, department, level_number in rows.iterator(chunk_size=2000):
+        yield student_id, matric_number, f'{first_name} {last_name}'.strip(), department, level_number
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class PdfSheets:
+    """Write a PDF whose pages are full-page grayscale images, one page at a time.
+
+    Object 1 is the catalog and object 2 the page tree; both are written
+    last, once every page is known.
+    """
+
+    # A4 in points.
+    PAGE_SIZE = (595.28, 841.89)
+
+    def __init__(self, pixels=SHEET_SIZE):
+        self.pixels = pixels
+        self.offsets = {}
+        self.position = 0
+        self.pages = []
+        self.next_number = 3
+
+    def _write(self, data):
+        self.position += len(data)
+        return data
+
+    def _object(self, number, body, stream=None):
+        self.offsets[number] = self.position
+        data = f'{number} 0 obj\n'.encode() + body
+        if stream is not None:
+            data += b'\nstream\n' + stream + b'\nendstream'
+        return self._write(data + b'\nendobj\n')
+
+    def _reserve(self, count):
+        first = self.next_number
+        self.next_number += count
+        return range(first, first + count)
+
+    def start(self):
+        return self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def page(self, pixels):
+        """One page showing ``pixels``, the zlib-compressed 8-bit grayscale image of a sheet."""
+        image, content, page = self._reserve(3)
+        width, height = self.pixels
+        page_width, page_height = self.PAGE_SIZE
+        drawing = f'q {page_width} 0 0 {page_height} 0 0 cm /Im0 Do Q'.encode()
+        self.pages.append(page)
+        return b''.join([
+            self._object(image, (
+                f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                f'/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(pixels)} >>'
+            ).encode(), pixels),
+            self._object(content, f'<< /Length {len(drawing)} >>'.encode(), drawing),
+            self._object(page, (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width} {page_height}] '
+                f'/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R >>'
+            ).encode()),
+        ])
+
+    def finish(self):
+        kids = ' '.join(f'{page} 0 R' for page in self.pages)
+        data = self._object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>'.encode())
+        data += self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref = self.position
+        count = self.next_number
+        entries = ''.join(
+            f'{self.offsets[number]:010d} 00000 n \n' if number in self.offsets else '0000000000 65535 f \n'
+            for number in range(1, count)
+        )
+        return data + (
+            f'xref\n0 {count}\n0000000000 65535 f \n{entries}'
+            f'trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'
+        ).encode()
+
+
+def stream_card_pdf(rows):
+    pdf = PdfSheets()
+    yield pdf.start()
+    for pixels in render_batches(render_card_sheet, batched(rows, CARDS_PER_SHEET)):
+        yield pdf.page(pixels)
+    yield pdf.finish()
+
+
+def stream_card_zip(rows):
+    sink = StreamSink()
+    # PNGs are already compressed.
+    archive = zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED)
+    for pngs in render_batches(render_card_pngs, batched(rows, ZIP_BATCH_SIZE)):
+        for matric_number, png in pngs:
+            archive.writestr(f'{matric_number.replace("/", "-")}.png', png)
+        yield sink.drain()
+    archive.close()
+    yield sink.drain()
+
+
+def export_qr_cards(students, export_format):
+    """Return a streaming download of the ID cards of ``students`` as a PDF of sheets or a ZIP of PNGs."""
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    rows = card_rows(students)
+    if export_format == 'pdf':
+        response = StreamingHttpResponse(stream_card_pdf(rows), content_type='application/pdf')
+    else:
+        response = StreamingHttpResponse(stream_card_zip(rows), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="qr_cards_{stamp}.{export_format}"'
+    return response
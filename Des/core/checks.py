@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """The default cache must be shared by the worker processes (see the CACHE setting)."""
+    if settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        'The default cache is kept in each process (CACHE=memory).',
+        hint=(
+            'Dashboard totals, remembered login misses and cached timetables go stale with several '
+            'worker processes. Set CACHE=file or CACHE=redis, or run a single worker process.'
+        ),
+        id='core.W001',
+    )]
@@ -0,0 +1,72 @@
+"""Cached row counts behind the admin dashboards.
+
+The totals live in Django's cache. Creates and deletes adjust them through
+the signal handlers in ``core.signals`` (once the transaction commits), bulk
+attendance writes report how many rows they added, a missing key is
+recounted on the next read, and entries expire after ``COUNTERS_TTL``
+seconds so drift from other processes or raw SQL cannot outlive it.
+``manage.py reconcile_counters`` recounts everything on demand (cron).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Admin, Attendance, ArchivedAttendance, Course, Lecturer, Student
+
+# The tables each total counts; archived attendance still counts (see core.archive).
+COUNTED_MODELS = {
+    'students': [Student],
+    'lecturers': [Lecturer],
+    'courses': [Course],
+    'attendance': [Attendance, ArchivedAttendance],
+    'admins': [Admin],
+}
+
+COUNTERS_TTL = getattr(settings, 'COUNTERS_TTL', 3600)
+
+
+def _key(name):
+    return f'counters:{name}'
+
+
+def _count(name):
+    return sum(model.objects.count() for model in COUNTED_MODELS[name])
+
+
+def get_counts(*names):
+    """Return ``{name: total}``, counting rows only for totals missing from the cache."""
+    names = names or tuple(COUNTED_MODELS)
+    cached = cache.get_many([_key(name) for name in names])
+    counts = {}
+    missing = {}
+    for name in names:
+        value = cached.get(_key(name))
+        if value is None:
+            value = missing[_key(name)] = _count(name)
+        counts[name] = value
+    if missing:
+        cache.set_many(missing, COUNTERS_TTL)
+    return counts
+
+
+def increment(name, delta=1):
+    """Adjust a cached total; an uncached total is simply recounted on next read."""
+    if not delta:
+        return
+    try:
+        cache.incr(_key(name), delta)
+    except ValueError:
+        pass
+
+
+def increment_on_commit(name, delta=1):
+    """Adjust a total once the current transaction commits (immediately outside one)."""
+    transaction.on_commit(lambda: increment(name, delta))
+
+
+def reconcile_counts():
+    """Recount every total and store it; returns ``{name: (cached, actual)}``."""
+    cached = cache.get_many([_key(name) for name in COUNTED_MODELS])
+    actual = {name: _count(name) for name in COUNTED_MODELS}
+    cache.set_many({_key(name): total for name, total in actual.items()}, COUNTERS_TTL)
+    return {name: (cached.get(_key(name)), total) for name, total in actual.items()}
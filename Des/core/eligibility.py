@@ -0,0 +1,280 @@
+"""Attendance percentages and exam eligibility for a whole cohort at once.
+
+``load_cohort`` reads a semester of ``Attendance`` into flat NumPy arrays,
+one small integer per row and column (student index, course index, day and
+status code) instead of one model instance per row. ``compute_eligibility``
+then works out every student's percentage in every course with a few
+vectorized passes over those arrays, whatever the size of the cohort.
+
+A course's sessions are the days in the period on which it has any
+attendance marked. Students enrolled in the course (its department and
+level) who have no row for a session count as absent from it, including
+students with no rows at all. Present counts as attended, and so does late
+unless ``ELIGIBILITY_COUNT_LATE`` is False. Courses that held no sessions
+in the period are left out.
+"""
+from itertools import chain, islice
+
+import numpy as np
+from django.conf import settings
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .archive import attendance_models
+from .models import Attendance, Course, Student
+
+STATUS_CODES = {status: code for code, (status, label) in enumerate(Attendance.STATUS_CHOICES)}
+
+ELIGIBILITY_THRESHOLD = getattr(settings, 'ELIGIBILITY_THRESHOLD', 75)
+ELIGIBILITY_COUNT_LATE = getattr(settings, 'ELIGIBILITY_COUNT_LATE', True)
+
+# Rows converted to arrays at a time, which bounds the Python objects alive while loading.
+CHUNK_SIZE = 20000
+
+
+class Cohort:
+    """A period of attendance for a set of courses, as parallel arrays.
+
+    ``student_ids`` and ``course_ids`` hold primary keys (courses in code
+    order); every other array holds positions in them. ``student``,
+    ``course``, ``day`` (days since 1970-01-01) and ``status`` (a
+    ``STATUS_CODES`` value) have one entry per attendance row;
+    ``enrolled_student`` and ``enrolled_course`` one per enrolment.
+    """
+
+    def __init__(self, student_ids, course_ids, student, course, day, status, enrolled_student, enrolled_course):
+        self.student_ids = student_ids
+        self.course_ids = course_ids
+        self.student = student
+        self.course = course
+        self.day = day
+        self.status = status
+        self.enrolled_student = enrolled_student
+        self.enrolled_course = enrolled_course
+
+    def __len__(self):
+        return len(self.status)
+
+
+def _columns(rows):
+    """Convert a batch of ``(student_id, course_id, 'YYYY-MM-DD', status)`` tuples to four arrays."""
+    student_ids, course_ids, days, statuses = zip(*rows)
+    statuses = np.array(statuses)
+    codes = np.zeros(len(statuses), dtype=np.int8)
+    for status, code in STATUS_CODES.items():
+        codes[statuses == status] = code
+    return (
+        np.array(student_ids, dtype=np.int64),
+        np.array(course_ids, dtype=np.int64),
+        # Parsing ISO dates in NumPy is far cheaper than building date objects per row.
+        np.array(days, dtype='datetime64[D]').astype(np.int32),
+        codes,
+    )
+
+
+def _read_rows(querysets, chunk_size):
+    rows = chain.from_iterable(
+        queryset.order_by()
+        .annotate(day=Cast('date', CharField()))
+        .values_list('student_id', 'course_id', 'day', 'status')
+        .iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    )
+    parts = []
+    while batch := list(islice(rows, chunk_size)):
+        parts.append(_columns(batch))
+    if not parts:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty.astype(np.int32), empty.astype(np.int8)
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def _int_columns(rows, count):
+    """Split ``rows`` of ``count`` integers into that many int64 arrays."""
+    if not rows:
+        return [np.array([], dtype=np.int64) for _ in range(count)]
+    return [np.array(column, dtype=np.int64) for column in zip(*rows)]
+
+
+def _enrolments(course_groups, student_groups):
+    """Match students to courses on (department, level).
+
+    Takes one group key per course and per student; returns the matching
+    ``(student positions, course positions)``.
+    """
+    order = np.argsort(student_groups, kind='stable')
+    sorted_groups = student_groups[order]
+    starts = np.searchsorted(sorted_groups, course_groups, side='left')
+    counts = np.searchsorted(sorted_groups, course_groups, side='right') - starts
+    # Position of every enrolment within its course's run of sorted students.
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    students = order[np.repeat(starts, counts) + offsets]
+    courses = np.repeat(np.arange(len(course_groups)), counts)
+    return students, courses
+
+
+def load_cohort(courses=None, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """Load the attendance of ``courses`` (a ``Course`` queryset, default all) between two dates into a ``Cohort``."""
+    if courses is None:
+        courses = Course.objects.all()
+    course_pks, course_departments, course_levels = _int_columns(
+        list(courses.order_by('code').values_list('id', 'department_id', 'level_id')), 3
+    )
+
+    filters = {'course__in': courses}
+    if date_from:
+        filters['date__gte'] = date_from
+    if date_to:
+        filters['date__lte'] = date_to
+    # Past semesters are read from the archive when the range reaches it.
+    records = [model.objects.filter(**filters) for model in attendance_models(date_from)]
+    row_students, row_courses, day, status = _read_rows(records, chunk_size)
+
+    roster_pks, roster_departments, roster_levels = _int_columns(
+        list(
+            Student.objects.filter(
+                department_id__in=course_departments.tolist(), level_id__in=course_levels.tolist()
+            ).values_list('id', 'department_id', 'level_id')
+        ),
+        3,
+    )
+    levels = int(max(course_levels.max(initial=0), roster_levels.max(initial=0))) + 1
+    enrolled_student, enrolled_course = _enrolments(
+        course_departments * levels + course_levels, roster_departments * levels + roster_levels
+    )
+
+    # Students with rows in a course outside their department and level are kept too.
+    student_ids = np.union1d(roster_pks, row_students)
+    course_order = np.argsort(course_pks)
+    return Cohort(
+        student_ids,
+        course_pks,
+        np.searchsorted(student_ids, row_students).astype(np.int32),
+        course_order[np.searchsorted(course_pks, row_courses, sorter=course_order)].astype(np.int32),
+        day,
+        status,
+        np.searchsorted(student_ids, roster_pks[enrolled_student]).astype(np.int32),
+        enrolled_course.astype(np.int32),
+    )
+
+
+def _student_names(pks, batch_size=5000):
+    """``{pk: (matric number, full name)}`` for the given students, fetched in batches."""
+    names = {}
+    for start in range(0, len(pks), batch_size):
+        rows = Student.objects.filter(pk__in=pks[start:start + batch_size]).values_list(
+            'id', 'matric_number', 'user__first_name', 'user__last_name'
+        )
+        for pk, matric_number, first_name, last_name in rows:
+            names[pk] = (matric_number, f'{first_name} {last_name}'.strip())
+    return names
+
+
+class Eligibility:
+    """Every (student, course) pair of a cohort with its attendance percentage.
+
+    All attributes are arrays with one entry per pair, ordered by course
+    code and then by percentage, lowest first.
+    """
+
+    def __init__(self, cohort, threshold, student, course, attended, held):
+        self.threshold = threshold
+        self.student_ids = cohort.student_ids[student]
+        self.course_ids = cohort.course_ids[course]
+        self.course = course
+        self.attended = attended
+        self.held = held
+        self.percentage = 100 * attended / held
+        self.eligible = self.percentage >= threshold
+        self._cohort = cohort
+
+    def __len__(self):
+        return len(self.held)
+
+    def course_totals(self):
+        """One dict per course with its sessions, students, ineligible count and mean percentage, in code order."""
+        count = len(self._cohort.course_ids)
+        students = np.bincount(self.course, minlength=count)
+        ineligible = np.bincount(self.course, weights=~self.eligible, minlength=count)
+        percentages = np.bincount(self.course, weights=self.percentage, minlength=count)
+        sessions = np.zeros(count, dtype=np.int64)
+        sessions[self.course] = self.held
+        names = Course.objects.only('code', 'title').in_bulk(self._cohort.course_ids.tolist())
+        return [
+            {
+                'code': names[course_pk].code,
+                'title': names[course_pk].title,
+                'sessions': int(sessions[n]),
+                'students': int(students[n]),
+                'ineligible': int(ineligible[n]),
+                'average': round(float(percentages[n] / students[n]), 1),
+            }
+            for n, course_pk in enumerate(self._cohort.course_ids.tolist())
+            if students[n]
+        ]
+
+    @property
+    def ineligible_count(self):
+        return int(np.count_nonzero(~self.eligible))
+
+    def rows(self, ineligible_only=True, limit=None):
+        """Pairs as dicts with student and course names, ineligible ones only by default."""
+        positions = np.flatnonzero(~self.eligible) if ineligible_only else np.arange(len(self))
+        positions = positions[:limit]
+        student_pks = self.student_ids[positions].tolist()
+        course_pks = self.course_ids[positions].tolist()
+        students = _student_names(sorted(set(student_pks)))
+        courses = Course.objects.only('code', 'title').in_bulk(set(course_pks))
+        return [
+            {
+                'matric_number': students[student_pk][0],
+                'name': students[student_pk][1],
+                'course_code': courses[course_pk].code,
+                'course_title': courses[course_pk].title,
+                'attended': int(self.attended[n]),
+                'held': int(self.held[n]),
+                'percentage': round(float(self.percentage[n]), 1),
+                'eligible': bool(self.eligible[n]),
+            }
+            for n, student_pk, course_pk in zip(positions.tolist(), student_pks, course_pks)
+        ]
+
+
+def compute_eligibility(cohort, threshold=ELIGIBILITY_THRESHOLD, count_late=ELIGIBILITY_COUNT_LATE):
+    """Attendance percentage of every enrolled student in every course of ``cohort``."""
+    courses = len(cohort.course_ids)
+
+    # Sessions held: distinct (course, day) pairs, counted per course.
+    first_day = cohort.day.min(initial=0)
+    sessions = np.unique(cohort.course.astype(np.int64) << 32 | (cohort.day - first_day).astype(np.int64))
+    held = np.bincount(sessions >> 32, minlength=courses)
+
+    # Each (student, course) pair as one integer: enrolments plus anyone with rows.
+    enrolled = cohort.enrolled_student.astype(np.int64) * courses + cohort.enrolled_course
+    marked = cohort.student.astype(np.int64) * courses + cohort.course
+    pairs, inverse = np.unique(np.concatenate([enrolled, marked]), return_inverse=True)
+    row_pair = inverse[len(enrolled):]
+
+    codes = [STATUS_CODES['present']] + ([STATUS_CODES['late']] if count_late else [])
+    attended = np.bincount(row_pair[np.isin(cohort.status, codes)], minlength=len(pairs))
+    student, course = np.divmod(pairs, courses) if courses else (pairs, pairs)
+    held = held[course]
+
+    keep = held > 0
+    student, course, attended, held = student[keep], course[keep], attended[keep], held[keep]
+    order = np.lexsort((attended / held, course))
+    return Eligibility(cohort, threshold, student[order], course[order], attended[order], held[order])
+
+
+ELIGIBILITY_COLUMNS = [
+    'Matric Number', 'Student', 'Course Code', 'Course Title', 'Attended', 'Sessions', 'Percentage', 'Eligible',
+]
+
+
+def csv_rows(rows):
+    """Flatten ``Eligibility.rows`` dicts in ``ELIGIBILITY_COLUMNS`` order."""
+    for row in rows:
+        yield (
+            row['matric_number'], row['name'], row['course_code'], row['course_title'],
+            row['attended'], row['held'], f"{row['percentage']:.1f}", 'Yes' if row['eligible'] else 'No',
+        )
@@ -0,0 +1,318 @@
+"""Live attendance events, streamed to lecturers as server-sent events.
+
+Every attendance row that is written is published, once its transaction
+commits, on the channel of its course and date, as the student's id and
+status. ``attendance_stream`` relays a channel to the browser and adds the
+student's name and matric number, looked up once per stream. The first connection receives a snapshot
+of the day's rows. A reconnecting client sends the id of the last event it
+saw (the ``Last-Event-ID`` header set by ``EventSource``) and only receives
+what it missed.
+
+``LocalBroker`` keeps a short backlog per channel in this process's memory.
+It therefore only relays writes made by the same process. Deployments with
+several worker processes point ``ATTENDANCE_EVENTS_BROKER`` at a broker
+shared between them, with the same methods.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .archive import attendance_models
+from .models import Student
+
+
+class Channel:
+    def __init__(self, backlog, floor):
+        self.events = deque(maxlen=backlog)  # (sequence, event, data)
+        self.latest = {}  # key -> data of the last event published for it
+        # Events up to this sequence number are not in the backlog.
+        self.floor = floor
+        self.waiters = set()  # (loop, future) of async subscribers
+
+
+class LocalBroker:
+    """In-process publish/subscribe with a bounded backlog per channel.
+
+    Event ids are ``<broker id>-<sequence>``. The sequence is shared by all
+    channels, so a channel that is evicted and created again never reuses
+    ids. Ids from another process or from before a restart are rejected
+    with None, and the client is sent a new snapshot.
+    """
+
+    def __init__(self, backlog=1000, max_channels=256):
+        self.backlog = backlog
+        self.max_channels = max_channels
+        self.id = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _channel(self, name):
+        # Callers hold the lock.
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self._channels[name] = Channel(self.backlog, self._sequence)
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        self._channels.move_to_end(name)
+        return channel
+
+    def _event_id(self, sequence):
+        return f'{self.id}-{sequence}'
+
+    def _sequence_of(self, event_id):
+        broker_id, _, sequence = (event_id or '').partition('-')
+        if broker_id != self.id or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def publish(self, name, event, data, key=None):
+        """Publish ``data`` on channel ``name``.
+
+        An event with a ``key`` is dropped when it equals the last one published
+        for that key, so rewriting an unchanged row sends nothing.
+        """
+        with self._lock:
+            channel = self._channel(name)
+            if key is not None:
+                if channel.latest.get(key) == data:
+                    return
+                channel.latest[key] = data
+            self._sequence += 1
+            if len(channel.events) == channel.events.maxlen:
+                channel.floor = channel.events[0][0]
+            channel.events.append((self._sequence, event, data))
+            waiters, channel.waiters = channel.waiters, set()
+            self._changed.notify_all()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def cursor(self, name):
+        """The id of the newest event on a channel; events after it are still to come."""
+        with self._lock:
+            self._channel(name)
+            return self._event_id(self._sequence)
+
+    def _since(self, channel, after):
+        if after is None or after < channel.floor:
+            return None
+        return [
+            (self._event_id(sequence), event, data)
+            for sequence, event, data in channel.events
+            if sequence > after
+        ]
+
+    def since(self, name, last_event_id):
+        """Events published after ``last_event_id``, or None if they are no longer all known."""
+        with self._lock:
+            return self._since(self._channel(name), self._sequence_of(last_event_id))
+
+    def wait(self, name, last_event_id, timeout):
+        """``since``, blocking up to ``timeout`` seconds while there is nothing new."""
+        after = self._sequence_of(last_event_id)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                events = self._since(self._channel(name), after)
+                remaining = deadline - time.monotonic()
+                if events is None or events or remaining <= 0:
+                    return events
+                self._changed.wait(remaining)
+
+    async def await_events(self, name, last_event_id, timeout):
+        """``wait`` for async code; the event loop is not blocked."""
+        after = self._sequence_of(last_event_id)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            channel = self._channel(name)
+            events = self._since(channel, after)
+            if events is None or events:
+                return events
+            future = loop.create_future()
+            waiter = (loop, future)
+            channel.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                channel.waiters.discard(waiter)
+        return self.since(name, last_event_id)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+broker = import_string(getattr(settings, 'ATTENDANCE_EVENTS_BROKER', 'core.events.LocalBroker'))(
+    backlog=getattr(settings, 'ATTENDANCE_EVENTS_BACKLOG', 1000),
+    max_channels=getattr(settings, 'ATTENDANCE_EVENTS_MAX_CHANNELS', 256),
+)
+
+
+def channel_name(course_id, day):
+    return f'attendance:{course_id}:{day}'
+
+
+def publish_attendance(course_id, day, rows):
+    """Publish ``(student_pk, status)`` rows of one course and day.
+
+    A status of None means the row was deleted.
+    """
+    name = channel_name(course_id, day)
+    for student_pk, status in rows:
+        broker.publish(name, 'attendance', {'student': student_pk, 'status': status}, key=student_pk)
+
+
+def publish_attendance_on_commit(course_id, day, rows):
+    """``publish_attendance`` once the current transaction commits, so clients never see rolled-back rows."""
+    rows = list(rows)
+    transaction.on_commit(lambda: publish_attendance(course_id, day, rows))
+
+
+def attendance_snapshot(course_id, day):
+    """Every attendance row of a course and day, as event payloads."""
+    snapshot = []
+    # A past day may have been archived.
+    for model in attendance_models(day):
+        rows = model.objects.filter(course_id=course_id, date=day).values_list(
+            'student_id', 'status', 'student__matric_number', 'student__user__first_name', 'student__user__last_name'
+        )
+        snapshot += [
+            {
+                'student': student_pk,
+                'status': status,
+                'name': f'{first_name} {last_name}'.strip(),
+                'matric_number': matric_number,
+            }
+            for student_pk, status, matric_number, first_name, last_name in rows
+        ]
+    return snapshot
+
+
+def student_names(student_pks):
+    """``{student pk: {'name': ..., 'matric_number': ...}}`` of the students that still exist."""
+    rows = Student.objects.filter(pk__in=student_pks).values_list(
+        'id', 'matric_number', 'user__first_name', 'user__last_name'
+    )
+    return {
+        pk: {'name': f'{first_name} {last_name}'.strip(), 'matric_number': matric_number}
+        for pk, matric_number, first_name, last_name in rows
+    }
+
+
+class StudentNames:
+    """The names a stream has already sent, so each student is looked up once per stream."""
+
+    def __init__(self):
+        self.known = {}
+
+    def missing(self, events):
+        """The students of ``events`` still to look up; a snapshot carries its own names."""
+        for event_id, event, data in events:
+            if event == 'snapshot':
+                for row in data['rows']:
+                    self.known[row['student']] = {'name': row['name'], 'matric_number': row['matric_number']}
+        return {
+            data['student'] for event_id, event, data in events
+            if event == 'attendance' and data['student'] not in self.known
+        }
+
+    def format(self, events):
+        """The events as server-sent events, attendance rows with their student's name."""
+        return [
+            format_event(event_id, event, {**data, **self.known.get(data['student'], {})})
+            if event == 'attendance' else format_event(event_id, event, data)
+            for event_id, event, data in events
+        ]
+
+    def resolve(self, events):
+        missing = self.missing(events)
+        if missing:
+            self.known.update(student_names(missing))
+        return self.format(events)
+
+    async def aresolve(self, events):
+        missing = self.missing(events)
+        if missing:
+            self.known.update(await sync_to_async(student_names)(missing))
+        return self.format(events)
+
+
+def format_event(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+# A stream ends after this many seconds and EventSource reconnects with its
+# last event id, so a threaded server does not keep a thread per screen forever.
+STREAM_MAX_AGE = getattr(settings, 'ATTENDANCE_EVENTS_STREAM_MAX_AGE', 300)
+HEARTBEAT = getattr(settings, 'ATTENDANCE_EVENTS_HEARTBEAT', 15)
+RETRY_MS = 3000
+
+
+def open_stream(course_id, day, last_event_id=None):
+    """Return ``(opening events, cursor)`` for a new connection.
+
+    A client resuming from an id the broker still covers gets the events it
+    missed; any other client gets a ``snapshot`` event with the day's rows.
+    """
+    name = channel_name(course_id, day)
+    if last_event_id:
+        missed = broker.since(name, last_event_id)
+        if missed is not None:
+            return missed, missed[-1][0] if missed else last_event_id
+    # Take the cursor before reading the rows: a write landing in between is
+    # sent again after the snapshot, which clients apply idempotently.
+    cursor = broker.cursor(name)
+    snapshot = {'date': str(day), 'rows': attendance_snapshot(course_id, day)}
+    return [(cursor, 'snapshot', snapshot)], cursor
+
+
+def stream_events(course_id, day, opening, cursor):
+    """The server-sent-events body of a WSGI response."""
+    name = channel_name(course_id, day)
+    names = StudentNames()
+    deadline = time.monotonic() + STREAM_MAX_AGE
+    yield f'retry: {RETRY_MS}\n\n'
+    yield from names.resolve(opening)
+    while (remaining := deadline - time.monotonic()) > 0:
+        events = broker.wait(name, cursor, min(HEARTBEAT, remaining))
+        if events is None:
+            # Too far behind for the backlog: reconnecting fetches a snapshot.
+            return
+        if not events:
+            yield ': keepalive\n\n'
+            continue
+        yield from names.resolve(events)
+        cursor = events[-1][0]
+
+
+async def astream_events(course_id, day, opening, cursor):
+    """``stream_events`` for ASGI responses, waiting on the event loop instead of a thread."""
+    name = channel_name(course_id, day)
+    names = StudentNames()
+    deadline = time.monotonic() + STREAM_MAX_AGE
+    yield f'retry: {RETRY_MS}\n\n'
+    for message in await names.aresolve(opening):
+        yield message
+    while (remaining := deadline - time.monotonic()) > 0:
+        events = await broker.await_events(name, cursor, min(HEARTBEAT, remaining))
+        if events is None:
+            return
+        if not events:
+            yield ': keepalive\n\n'
+            continue
+        for message in await names.aresolve(events):
+            yield message
+        cursor = events[-1][0]
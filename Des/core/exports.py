@@ -0,0 +1,229 @@
+"""Streaming exports of attendance records.
+
+Rows are read with a chunked server-side iterator over a flat
+``values_list`` projection and written out as they arrive, so memory use
+does not depend on the size of the export and the first bytes reach the
+client before the query has been fully read.
+"""
+import csv
+import heapq
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Attendance
+
+EXPORT_COLUMNS = [
+    'Date', 'Course Code', 'Course Title', 'Matric Number', 'Student',
+    'Department', 'Status', 'Marked By', 'Marked At',
+]
+EXPORT_FORMATS = ('csv', 'excel')
+
+# Rows fetched from the database per round trip.
+CHUNK_SIZE = 2000
+
+# Excel refuses sheets longer than 1,048,576 rows (one is the header).
+XLSX_ROWS_PER_SHEET = 1048575
+
+STATUS_LABELS = dict(Attendance.STATUS_CHOICES)
+
+
+def export_rows(querysets, chunk_size=CHUNK_SIZE):
+    """Yield one flat tuple of strings per attendance record of ``querysets`` (a table and its archive)."""
+    tables = [
+        queryset.order_by('-date', 'course__code', 'id').values_list(
+            'date', 'course__code', 'course__title', 'student__matric_number',
+            'student__user__first_name', 'student__user__last_name', 'student__department__code',
+            'status', 'marked_by__user__first_name', 'marked_by__user__last_name', 'marked_at', 'id',
+        ).iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    ]
+    # Each table is read in export order, so merging them streams too.
+    rows = heapq.merge(*tables, key=lambda row: (-row[0].toordinal(), row[1], row[-1])) if len(tables) > 1 else tables[0]
+    for (day, code, title, matric_number, first_name, last_name, department,
+         status, marker_first_name, marker_last_name, marked_at, pk) in rows:
+        yield (
+            day.isoformat(),
+            code,
+            title,
+            matric_number,
+            f'{first_name} {last_name}'.strip(),
+            department,
+            STATUS_LABELS.get(status, status),
+            f'{marker_first_name} {marker_last_name}'.strip(),
+            timezone.localtime(marked_at).strftime('%Y-%m-%d %H:%M'),
+        )
+
+
+def stream_csv(rows, rows_per_chunk=500, columns=EXPORT_COLUMNS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # The header goes out before the query runs.
+    writer.writerow(columns)
+    yield drain()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield drain()
+    yield drain()
+
+
+class StreamSink:
+    """Write-only, unseekable file object whose contents are drained by a generator.
+
+    ``zipfile`` writes data descriptors instead of seeking back when it is
+    given a file object like this, which is what makes streaming archives
+    possible.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Characters that are not allowed anywhere in an XML 1.0 document.
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_row(values):
+    cells = ''.join(
+        f'<c t="inlineStr"><is><t>{escape(_ILLEGAL_XML_CHARS.sub("", str(value)))}</t></is></c>'
+        for value in values
+    )
+    return f'<row>{cells}</row>'
+
+
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _xlsx_package_parts(sheet_count):
+    """The workbook-level parts, which can only be written once the sheet count is known."""
+    sheets = range(1, sheet_count + 1)
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for n in sheets
+        )
+        + '</Types>'
+    )
+    root_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+        + ''.join(f'<sheet name="Attendance {n}" sheetId="{n}" r:id="rId{n}"/>' for n in sheets)
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + ''.join(
+            f'<Relationship Id="rId{n}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{n}.xml"/>'
+            for n in sheets
+        )
+        + '</Relationships>'
+    )
+    return [
+        ('[Content_Types].xml', content_types),
+        ('_rels/.rels', root_rels),
+        ('xl/workbook.xml', workbook),
+        ('xl/_rels/workbook.xml.rels', workbook_rels),
+    ]
+
+
+def stream_xlsx(rows, rows_per_chunk=500):
+    """Yield an XLSX workbook, starting a new sheet every ``XLSX_ROWS_PER_SHEET`` rows."""
+    sink = StreamSink()
+    archive = zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED)
+    sheet_count = 0
+    sheet = None
+    sheet_rows = 0
+    pending = []
+
+    def open_sheet():
+        nonlocal sheet, sheet_count, sheet_rows
+        sheet_count += 1
+        sheet_rows = 0
+        sheet = archive.open(f'xl/worksheets/sheet{sheet_count}.xml', mode='w', force_zip64=True)
+        sheet.write((_SHEET_HEADER + _xlsx_row(EXPORT_COLUMNS)).encode())
+
+    open_sheet()
+    yield sink.drain()
+    for row in rows:
+        if sheet_rows == XLSX_ROWS_PER_SHEET:
+            sheet.write((''.join(pending) + _SHEET_FOOTER).encode())
+            pending = []
+            sheet.close()
+            open_sheet()
+        pending.append(_xlsx_row(row))
+        sheet_rows += 1
+        if len(pending) >= rows_per_chunk:
+            sheet.write(''.join(pending).encode())
+            pending = []
+            yield sink.drain()
+
+    sheet.write((''.join(pending) + _SHEET_FOOTER).encode())
+    sheet.close()
+    for name, content in _xlsx_package_parts(sheet_count):
+        archive.writestr(name, content)
+    archive.close()
+    yield sink.drain()
+
+
+def export_attendance(querysets, export_format):
+    """Return a streaming download of the attendance records of ``querysets`` as CSV or XLSX."""
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    rows = export_rows(querysets)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+        filename = f'attendance_report_{stamp}.csv'
+    else:
+        response = StreamingHttpResponse(
+            stream_xlsx(rows),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        filename = f'attendance_report_{stamp}.xlsx'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
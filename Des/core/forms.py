@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import authenticate
 from .models import User, Student, Lecturer, Course, Department, Level, Timetable, Attendance
+from .logins import find_lecturer_username
 
 class StudentRegistrationForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True)
@@ -32,7 +33,7 @@ class StudentRegistrationForm(UserCreationForm):
         return user
 
 class LecturerLoginForm(AuthenticationForm):
-    username = forms.CharField(label='Name', widget=forms.TextInput(attrs={'class': 'form-control'}))
+    username = forms.CharField(label='Name or Employee ID', widget=forms.TextInput(attrs={'class': 'form-control'}))
     password = forms.CharField(widget=forms.PasswordInput(attrs={'class': 'form-control'}))
     
     def clean(self):
@@ -40,15 +41,17 @@ class LecturerLoginForm(AuthenticationForm):
         password = self.cleaned_data.get('password')
         
         if username and password:
-            # Try to find lecturer by name
+            # Find the lecturer by name or employee ID (see core.logins)
             try:
-                lecturer = Lecturer.objects.get(user__first_name__icontains=username)
-                user = authenticate(username=lecturer.user.username, password=password)
-                if user is None:
-                    raise forms.ValidationError('Invalid credentials')
-                self.user_cache = user
-            except Lecturer.DoesNotExist:
+                lecturer_username = find_lecturer_username(username)
+            except Lecturer.MultipleObjectsReturned:
+                raise forms.ValidationError('Several lecturers have this name, please sign in with your Employee ID')
+            if lecturer_username is None:
                 raise forms.ValidationError('Lecturer not found')
+            user = authenticate(username=lecturer_username, password=password)
+            if user is None:
+                raise forms.ValidationError('Invalid credentials')
+            self.user_cache = user
         
         return self.cleaned_data
 
@@ -126,6 +129,18 @@ class LevelForm(forms.ModelForm):
             'level_number': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+class StudentImportForm(forms.Form):
+    file = forms.FileField(
+        label='CSV file',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}),
+    )
+    password = forms.CharField(
+        label='Initial password',
+        required=False,
+        widget=forms.PasswordInput(attrs={'class': 'form-control'}),
+        help_text='Given to every imported student. Leave empty to have them reset it before their first login.',
+    )
+
 class LecturerForm(forms.ModelForm):
     first_name = forms.CharField(max_length=30, required=True)
     last_name = forms.CharField(max_length=30, required=True)
@@ -0,0 +1,230 @@
+"""Bulk student import from CSV.
+
+The CSV has a header row with the columns ``first_name``, ``last_name``,
+``email``, ``matric_number``, ``department`` (department code) and ``level``
+(level number). Rows are read as a stream and handled ``IMPORT_CHUNK_SIZE``
+at a time: each chunk is validated, then its users and students are
+inserted with one bulk statement each inside a transaction, so a failed or
+interrupted import leaves whole chunks behind and never a user without its
+student.
+
+Every imported account gets the same initial password, hashed once for the
+whole import (or an unusable one when none is given). QR images are not
+rendered: they are drawn on first view or by ``generate_qr_codes``.
+
+Importing is idempotent: a row whose matric number is already registered to
+the same email is skipped, so a file can be imported again after fixing the
+rows that were rejected. Emails are compared and stored in lower case.
+
+A file that stops decoding part way through keeps the chunks imported
+before that point; the report says after which line the import stopped.
+"""
+import csv
+import io
+import itertools
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .counters import increment_on_commit
+from .models import User, Student, Department, Level
+from .roster import roster_index
+
+IMPORT_COLUMNS = ['first_name', 'last_name', 'email', 'matric_number', 'department', 'level']
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Rejected rows kept for the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 200
+
+MATRIC_VALIDATORS = Student._meta.get_field('matric_number').validators
+NAME_MAX_LENGTH = User._meta.get_field('first_name').max_length
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []
+        # Why the file could not be read to the end; rows after ``last_line`` were not imported.
+        self.stopped = None
+        self.last_line = 1
+        self.started = time.perf_counter()
+        self.elapsed = 0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def rate(self):
+        """Rows handled per second."""
+        return self.rows / self.elapsed if self.elapsed else 0
+
+
+class StudentImporter:
+    """Import students from an iterable of CSV lines (see the module docstring)."""
+
+    def __init__(self, password=None, chunk_size=IMPORT_CHUNK_SIZE):
+        self.password_hash = make_password(password or None)
+        self.chunk_size = chunk_size
+        self.departments = dict(Department.objects.values_list('code', 'id'))
+        self.levels = {str(number): pk for number, pk in Level.objects.values_list('level_number', 'id')}
+        # Matric numbers and emails already seen in this file.
+        self.seen_matric_numbers = set()
+        self.seen_emails = set()
+        self.issued_student_ids = set()
+
+    def run(self, lines):
+        report = ImportReport()
+        reader = csv.DictReader(lines)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        missing = [column for column in IMPORT_COLUMNS if column not in reader.fieldnames]
+        if missing:
+            raise ValueError(f'The CSV has no {", ".join(missing)} column{"s" if len(missing) > 1 else ""}')
+
+        # Line numbers as shown in a spreadsheet: the header is line 1.
+        numbered = enumerate(reader, start=2)
+        try:
+            while chunk := list(itertools.islice(numbered, self.chunk_size)):
+                report.rows += len(chunk)
+                self.import_chunk(chunk, report)
+                report.last_line = chunk[-1][0]
+        except UnicodeDecodeError as e:
+            # The chunks before are committed, so they are reported rather than lost.
+            report.stopped = (
+                f'Stopped after line {report.last_line}: the rest of the file is not valid {e.encoding} text '
+                f'({e.reason})'
+            )
+        if report.created:
+            # bulk_create sends no signals.
+            roster_index.invalidate()
+        report.elapsed = time.perf_counter() - report.started
+        return report
+
+    def clean(self, row):
+        """Return the row's cleaned values, or raise ValidationError with the first problem."""
+        values = {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+        for column in IMPORT_COLUMNS:
+            if not values[column]:
+                raise ValidationError(f'{column} is empty')
+        for column in ('first_name', 'last_name'):
+            if len(values[column]) > NAME_MAX_LENGTH:
+                raise ValidationError(f'{column} is longer than {NAME_MAX_LENGTH} characters')
+        try:
+            validate_email(values['email'])
+        except ValidationError:
+            raise ValidationError(f'{values["email"]} is not a valid email address')
+        values['email'] = values['email'].lower()
+        for validator in MATRIC_VALIDATORS:
+            validator(values['matric_number'])
+        if values['department'] not in self.departments:
+            raise ValidationError(f'Unknown department code {values["department"]}')
+        if values['level'] not in self.levels:
+            raise ValidationError(f'Unknown level {values["level"]}')
+        return values
+
+    def new_student_ids(self, count):
+        """``count`` unused student IDs in the format of ``Student.save``.
+
+        Eight hex digits collide within tens of thousands of students, so
+        clashes with the database and within the import are drawn again.
+        """
+        ids = set()
+        while len(ids) < count:
+            candidates = {f'STU{str(uuid.uuid4())[:8].upper()}' for _ in range(count - len(ids))}
+            candidates -= self.issued_student_ids
+            candidates -= set(Student.objects.filter(student_id__in=candidates).values_list('student_id', flat=True))
+            ids |= candidates
+            self.issued_student_ids |= candidates
+        return list(ids)
+
+    def import_chunk(self, chunk, report):
+        rows = []
+        for line, row in chunk:
+            try:
+                values = self.clean(row)
+            except ValidationError as e:
+                report.reject(line, e.messages[0])
+                continue
+            if values['matric_number'] in self.seen_matric_numbers:
+                report.reject(line, f'{values["matric_number"]} appears earlier in the file')
+                continue
+            if values['email'] in self.seen_emails:
+                report.reject(line, f'{values["email"]} appears earlier in the file')
+                continue
+            self.seen_matric_numbers.add(values['matric_number'])
+            self.seen_emails.add(values['email'])
+            rows.append((line, values))
+
+        registered = dict(Student.objects.filter(
+            matric_number__in=[values['matric_number'] for line, values in rows]
+        ).values_list('matric_number', Lower('user__email')))
+        # Usernames and emails registered through the sign-up form or the
+        # Django admin keep their case, and an account's username need not be
+        # its email.
+        emails = [values['email'] for line, values in rows]
+        taken_emails = set()
+        for names in User.objects.annotate(username_lower=Lower('username'), email_lower=Lower('email')).filter(
+            Q(username_lower__in=emails) | Q(email_lower__in=emails)
+        ).values_list('username_lower', 'email_lower'):
+            taken_emails.update(names)
+
+        new_rows = []
+        for line, values in rows:
+            email = registered.get(values['matric_number'])
+            if email == values['email']:
+                # Imported before.
+                report.skipped += 1
+            elif email is not None:
+                report.reject(line, f'{values["matric_number"]} is registered to another student')
+            elif values['email'] in taken_emails:
+                report.reject(line, f'{values["email"]} is already used by another account')
+            else:
+                new_rows.append(values)
+        if not new_rows:
+            return
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=values['email'],
+                    email=values['email'],
+                    first_name=values['first_name'],
+                    last_name=values['last_name'],
+                    user_type='student',
+                    password=self.password_hash,
+                )
+                for values in new_rows
+            ])
+            Student.objects.bulk_create([
+                Student(
+                    user_id=user.pk,
+                    matric_number=values['matric_number'],
+                    student_id=student_id,
+                    department_id=self.departments[values['department']],
+                    level_id=self.levels[values['level']],
+                )
+                for user, values, student_id in zip(users, new_rows, self.new_student_ids(len(new_rows)))
+            ])
+            increment_on_commit('students', len(new_rows))
+        report.created += len(new_rows)
+
+
+def import_students(file, password=None, encoding='utf-8-sig'):
+    """Import students from a binary file object, such as an upload; returns an ``ImportReport``."""
+    lines = io.TextIOWrapper(file, encoding=encoding, newline='')
+    try:
+        return StudentImporter(password).run(lines)
+    finally:
+        # Leave the underlying file open for its owner.
+        lines.detach()
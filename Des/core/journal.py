@@ -0,0 +1,267 @@
+"""Write-behind journal for QR scans (``SCAN_WRITE_MODE = 'journal'``).
+
+In this mode a scan is resolved against the cached roster, appended to a
+local append-only journal and answered as soon as the journal write is on
+disk, without waiting for SQLite. ``flush_scan_journal`` drains the journal
+into ``Attendance`` with one transaction per batch, so the scan rate is no
+longer bound by the database's commit latency.
+
+Every process appends to its own segment file, named after the period it
+was opened in (``SCAN_JOURNAL_SEGMENT_SECONDS``), its pid and a random
+token. Writers never share a file, so a writer that crashes mid-write can
+only leave a torn last line behind, and that scan was never acknowledged.
+
+The flusher keeps its position in each segment in ``ScanJournalCheckpoint``
+and moves it in the transaction that writes the scans. Every acknowledged
+scan is written once: a flusher restarted after a crash carries on from the
+last committed position, and a second flusher running by mistake fails to
+move a position the first already moved and writes nothing. A segment is
+deleted once its period is over and all of it has been written.
+
+A flushed scan sets the status to present, as a rescan does, so a manual
+change made to the same student before the flusher reached the scan is
+overwritten; the flusher normally runs a fraction of a second behind.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+
+from .attendance import resolve_scans, upsert_attendance
+from .events import publish_attendance
+from .metrics import registry
+from .models import Student, Course, Lecturer, ScanJournalCheckpoint
+
+SCAN_WRITE_MODE = getattr(settings, 'SCAN_WRITE_MODE', 'direct')
+
+SCAN_JOURNAL_DIR = getattr(settings, 'SCAN_JOURNAL_DIR', os.path.join(settings.BASE_DIR, 'journal'))
+
+# Seconds a segment is appended to before its writer opens the next one.
+SCAN_JOURNAL_SEGMENT_SECONDS = getattr(settings, 'SCAN_JOURNAL_SEGMENT_SECONDS', 60)
+
+# Scans written per flusher transaction.
+SCAN_FLUSH_BATCH = 5000
+
+SEGMENT_SUFFIX = '.jsonl'
+
+
+class JournalConflict(Exception):
+    """Another flusher moved a segment's position first."""
+
+
+def segment_period(timestamp):
+    return int(timestamp // SCAN_JOURNAL_SEGMENT_SECONDS * SCAN_JOURNAL_SEGMENT_SECONDS)
+
+
+def is_sealed(segment, now):
+    """Whether nothing is appended to ``segment`` any more.
+
+    Writers move to a new segment when the period changes; one more period
+    is allowed for writes that were already under way.
+    """
+    return int(segment.split('-', 1)[0]) + 2 * SCAN_JOURNAL_SEGMENT_SECONDS <= now
+
+
+def _sync_directory(directory):
+    """Make a new segment's directory entry durable (Windows has no directory handles to sync)."""
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class ScanJournal:
+    """The segment this process appends journaled scans to."""
+
+    def __init__(self, directory=SCAN_JOURNAL_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._fd = None
+        self._period = None
+        self._pid = None
+
+    def _open(self, period):
+        if self._fd is not None:
+            os.close(self._fd)
+        os.makedirs(self.directory, exist_ok=True)
+        # A forked worker must not append to its parent's segment.
+        self._pid = os.getpid()
+        name = f'{period}-{self._pid}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}'
+        self._fd = os.open(os.path.join(self.directory, name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        _sync_directory(self.directory)
+        self._period = period
+
+    def append(self, records):
+        """Append ``records`` (JSON-serialisable dicts), returning once they are on disk."""
+        data = memoryview(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records).encode())
+        with self._lock:
+            period = segment_period(time.time())
+            if period != self._period or self._pid != os.getpid():
+                self._open(period)
+            while data:
+                data = data[os.write(self._fd, data):]
+            os.fsync(self._fd)
+
+
+scan_journal = ScanJournal()
+
+
+def journal_scans(roster, marked_by_id, payloads, attendance_date=None):
+    """``record_scans`` that answers once the scans are journaled (see the module docstring)."""
+    results, entries = resolve_scans(roster, payloads)
+    if entries:
+        day = attendance_date or date.today()
+        at = time.time()
+        scan_journal.append([
+            {
+                'course': roster.course_id,
+                'date': day.isoformat(),
+                'marked_by': marked_by_id,
+                'student': student_pk,
+                'at': at,
+            }
+            for student_pk, status, notes in entries
+        ])
+        # The live feed shows the scans now rather than when they are flushed.
+        publish_attendance(roster.course_id, day, [(student_pk, status) for student_pk, status, notes in entries])
+    return results
+
+
+def segments(directory=SCAN_JOURNAL_DIR):
+    """The journal's segment names, oldest period first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith(SEGMENT_SUFFIX))
+
+
+def read_segment(path, offset, limit):
+    """Up to ``limit`` complete records of a segment from byte ``offset``.
+
+    Returns ``(records, new offset, whether the end was reached)``. A last
+    line without its newline is a write under way, or one torn by a crash,
+    and is left where it is.
+    """
+    records = []
+    with open(path, 'rb') as segment:
+        segment.seek(offset)
+        for line in segment:
+            if len(records) >= limit:
+                return records, offset, False
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f'{path}: unreadable journal line at byte {offset}')
+            offset += len(line)
+    return records, offset, True
+
+
+def _write_batch(batch, advanced, offsets):
+    with transaction.atomic():
+        # The positions are moved first, so the transaction writes before it reads.
+        for name, (old, new) in advanced.items():
+            if name in offsets:
+                if not ScanJournalCheckpoint.objects.filter(segment=name, offset=old).update(offset=new):
+                    raise JournalConflict(name)
+            else:
+                try:
+                    ScanJournalCheckpoint.objects.create(segment=name, offset=new)
+                except IntegrityError:
+                    raise JournalConflict(name)
+
+        # Scans of students, courses or lecturers deleted since are dropped.
+        students = set(Student.objects.filter(
+            pk__in={record['student'] for record in batch}
+        ).values_list('pk', flat=True))
+        courses = set(Course.objects.filter(
+            pk__in={record['course'] for record in batch}
+        ).values_list('pk', flat=True))
+        lecturers = set(Lecturer.objects.filter(
+            pk__in={record['marked_by'] for record in batch}
+        ).values_list('pk', flat=True))
+
+        groups = defaultdict(dict)
+        for record in batch:
+            if record['student'] in students and record['course'] in courses and record['marked_by'] in lecturers:
+                key = (record['course'], record['date'], record['marked_by'])
+                groups[key][record['student']] = (record['student'], 'present', None)
+        for (course_id, day, marked_by_id), entries in groups.items():
+            # As record_scans: only the status changes on a rescan.
+            upsert_attendance(
+                course_id, date.fromisoformat(day), marked_by_id, entries.values(), update_fields=('status',)
+            )
+
+
+def flush_journal(batch_size=SCAN_FLUSH_BATCH, directory=SCAN_JOURNAL_DIR):
+    """Write up to ``batch_size`` journaled scans to ``Attendance`` in one transaction; returns how many.
+
+    Also deletes the sealed segments that have been written completely.
+    Returns 0 when another flusher got to the same scans first.
+    """
+    now = time.time()
+    names = segments(directory)
+    offsets = dict(ScanJournalCheckpoint.objects.filter(segment__in=names).values_list('segment', 'offset'))
+    batch = []
+    advanced = {}
+    finished = []
+    for name in names:
+        if len(batch) >= batch_size:
+            break
+        offset = offsets.get(name, 0)
+        try:
+            records, new_offset, at_end = read_segment(os.path.join(directory, name), offset, batch_size - len(batch))
+        except FileNotFoundError:
+            continue
+        if records:
+            batch += records
+            advanced[name] = (offset, new_offset)
+        elif at_end and is_sealed(name, now):
+            finished.append(name)
+
+    if batch:
+        try:
+            _write_batch(batch, advanced, offsets)
+        except JournalConflict:
+            return 0
+
+    for name in finished:
+        # The file goes first: a checkpoint without its file is harmless,
+        # a file without its checkpoint would be written again.
+        os.remove(os.path.join(directory, name))
+        ScanJournalCheckpoint.objects.filter(segment=name).delete()
+    return len(batch)
+
+
+def journal_lag(directory=SCAN_JOURNAL_DIR):
+    """Seconds since the oldest scan not yet written to the database was journaled; 0 when there is none."""
+    names = segments(directory)
+    if not names:
+        return 0
+    offsets = dict(ScanJournalCheckpoint.objects.filter(segment__in=names).values_list('segment', 'offset'))
+    oldest = None
+    for name in names:
+        try:
+            records, new_offset, at_end = read_segment(os.path.join(directory, name), offsets.get(name, 0), 1)
+        except FileNotFoundError:
+            continue
+        if records and (oldest is None or records[0]['at'] < oldest):
+            oldest = records[0]['at']
+    return max(0, time.time() - oldest) if oldest is not None else 0
+
+
+registry.gauge(
+    'attendance_scan_journal_lag_seconds',
+    'Age of the oldest journaled scan not yet written to the database (SCAN_WRITE_MODE=journal).',
+    journal_lag,
+)
@@ -0,0 +1,81 @@
+"""Lecturer lookup for the name-based login form.
+
+Lecturers sign in with their first name (or their employee ID). The name is
+normalized with ``normalize_login_name`` and matched against the indexed
+``Lecturer.login_name`` column, so a login costs one index lookup however
+large the users table is. Names that only match part of a first name (the
+original ``icontains`` behaviour) are still accepted through a substring
+scan. Names that match nothing are remembered in the cache for
+``LECTURER_LOGIN_MISS_TTL`` seconds, so repeated attempts with an unknown
+name do not repeat that scan. Creating or renaming a lecturer forgets the
+remembered misses.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Lecturer, normalize_login_name
+
+LECTURER_LOGIN_MISS_TTL = getattr(settings, 'LECTURER_LOGIN_MISS_TTL', 300)
+
+GENERATION_KEY = 'lecturer_login:generation'
+
+
+def _miss_key(identifier):
+    # Keyed on what the substring scan searched for: icontains ignores case,
+    # but not the spaces and titles that normalize_login_name drops. Hashed,
+    # as cache keys cannot hold arbitrary text.
+    # Bumping the generation orphans every remembered miss at once.
+    generation = cache.get_or_set(GENERATION_KEY, 1, None)
+    digest = hashlib.sha256(identifier.casefold().encode()).hexdigest()
+    return f'lecturer_login:miss:{generation}:{digest}'
+
+
+def forget_misses():
+    """Drop every remembered unknown name (a lecturer was added or renamed)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+
+
+def _single(queryset):
+    matches = list(queryset.order_by().values_list('user__username', flat=True)[:2])
+    if len(matches) > 1:
+        raise Lecturer.MultipleObjectsReturned('More than one lecturer matches this name')
+    return matches[0] if matches else None
+
+
+def find_lecturer_username(identifier):
+    """Return the username of the lecturer signing in as ``identifier``, or None.
+
+    Raises ``Lecturer.MultipleObjectsReturned`` when the name is shared by
+    several lecturers; they have to sign in with their employee ID.
+    """
+    identifier = (identifier or '').strip()
+    name = normalize_login_name(identifier)
+    if not name:
+        return None
+
+    matches = list(
+        Lecturer.objects.filter(Q(login_name=name) | Q(employee_id=identifier))
+        .order_by()
+        .values_list('employee_id', 'user__username')[:2]
+    )
+    for employee_id, username in matches:
+        if employee_id == identifier:
+            return username
+    if len(matches) > 1:
+        raise Lecturer.MultipleObjectsReturned('More than one lecturer matches this name')
+    if matches:
+        return matches[0][1]
+
+    miss_key = _miss_key(identifier)
+    if cache.get(miss_key):
+        return None
+    username = _single(Lecturer.objects.filter(user__first_name__icontains=identifier))
+    if username is None:
+        cache.set(miss_key, True, LECTURER_LOGIN_MISS_TTL)
+    return username
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.archive import archive_attendance, default_cutoff, ARCHIVE_CHUNK_SIZE, ATTENDANCE_HOT_DAYS
+from core.models import Attendance, ArchivedAttendance
+
+
+class Command(BaseCommand):
+    help = (
+        'Move attendance older than the current term into the archive table in chunks, '
+        'so the hot table stays small (safe to run from cron and to rerun)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help=f'Archive attendance dated before this day (YYYY-MM-DD, default {ATTENDANCE_HOT_DAYS} days ago)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ARCHIVE_CHUNK_SIZE,
+            help='Rows moved per transaction',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help='Seconds to wait between chunks, leaving the write lock to requests',
+        )
+
+    def handle(self, *args, **options):
+        before = default_cutoff()
+        if options['before']:
+            before = parse_date(options['before'])
+            if before is None:
+                raise CommandError('--before must be a date (YYYY-MM-DD)')
+
+        def progress(moved):
+            self.stdout.write(f'  {moved} rows moved')
+            time.sleep(options['pause'])
+
+        start = time.perf_counter()
+        try:
+            moved = archive_attendance(before, options['chunk_size'], progress)
+        except ValueError as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - start
+        rate = moved / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} attendance rows dated before {before} in {elapsed:.1f}s ({rate:,.0f} rows/s); '
+            f'{Attendance.objects.count()} rows remain current, {ArchivedAttendance.objects.count()} are archived'
+        ))
@@ -0,0 +1,277 @@
+import io
+import json
+import logging
+import platform
+import time
+import tracemalloc
+from datetime import date, timedelta
+from itertools import cycle
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+
+from core.bench import temporary_database, bench_client, measure, percentile
+from core.models import Admin, Attendance, Course, Student
+from core.roster import roster_index
+
+
+def scenarios(course, student):
+    """Every route of core/urls.py as ``(name, role, method, url, payload)``.
+
+    ``payload`` is called with the run number and returns the request body
+    (a form dict, or a dict sent as JSON when the name ends in ``_json``).
+    """
+    roster = list(Student.objects.filter(department=course.department_id, level=course.level_id).values_list(
+        'id', 'student_id', 'matric_number'
+    ))
+    scans = cycle([f'STUDENT:{student_id}:{matric_number}' for pk, student_id, matric_number in roster])
+    today = date.today()
+
+    def mark_form(run):
+        form = {'date': today.isoformat()}
+        for pk, student_id, matric_number in roster:
+            form[f'status_{pk}'] = 'present' if (pk + run) % 3 else 'late'
+            form[f'notes_{pk}'] = ''
+        return form
+
+    filtered = (
+        f'?course={course.id}&date_from={(today - timedelta(days=30)).isoformat()}&date_to={today.isoformat()}'
+    )
+    return [
+        ('home', 'anonymous', 'get', reverse('home'), None),
+        ('student_register', 'anonymous', 'get', reverse('student_register'), None),
+        ('student_login', 'anonymous', 'get', reverse('student_login'), None),
+        ('lecturer_login', 'anonymous', 'get', reverse('lecturer_login'), None),
+        ('admin_login', 'anonymous', 'get', reverse('admin_login'), None),
+        ('student_dashboard', 'student', 'get', reverse('student_dashboard'), None),
+        ('student_qr_code', 'student', 'get', reverse('student_qr_code'), None),
+        ('attendance_history', 'student', 'get', reverse('attendance_history'), None),
+        ('timetable_view', 'student', 'get', reverse('timetable_view'), None),
+        ('lecturer_dashboard', 'lecturer', 'get', reverse('lecturer_dashboard'), None),
+        ('mark_attendance', 'lecturer', 'get', reverse('mark_attendance', args=[course.id]), None),
+        ('mark_attendance_post', 'lecturer', 'post', reverse('mark_attendance', args=[course.id]), mark_form),
+        ('qr_scanner', 'lecturer', 'get', reverse('qr_scanner', args=[course.id]), None),
+        ('process_qr_scan_json', 'lecturer', 'post', reverse('process_qr_scan', args=[course.id]),
+         lambda run: {'qr_data': next(scans)}),
+        ('process_qr_scan_batch_json', 'lecturer', 'post', reverse('process_qr_scan_batch', args=[course.id]),
+         lambda run: {'scans': [next(scans) for _ in range(50)]}),
+        ('admin_dashboard', 'admin', 'get', reverse('admin_dashboard'), None),
+        ('manage_courses', 'admin', 'get', reverse('manage_courses'), None),
+        ('manage_timetable', 'admin', 'get', reverse('manage_timetable'), None),
+        ('manage_departments', 'admin', 'get', reverse('manage_departments'), None),
+        ('manage_levels', 'admin', 'get', reverse('manage_levels'), None),
+        ('manage_lecturers', 'admin', 'get', reverse('manage_lecturers'), None),
+        ('attendance_reports', 'admin', 'get', reverse('attendance_reports'), None),
+        ('attendance_reports_filtered', 'admin', 'get', reverse('attendance_reports') + filtered, None),
+        ('attendance_reports_department', 'admin', 'get',
+         reverse('attendance_reports') + f'?department={course.department_id}', None),
+        ('super_admin_dashboard', 'super_admin', 'get', reverse('super_admin_dashboard'), None),
+        ('manage_admins', 'super_admin', 'get', reverse('manage_admins'), None),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every view at several dataset sizes and write the results as JSON '
+        '(runs in a throwaway database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated student counts to benchmark',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed requests per view and size',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=20,
+            help='Days of attendance history generated for each dataset',
+        )
+        parser.add_argument(
+            '--classes-per-day',
+            type=int,
+            default=10,
+            help='Courses meeting per weekday in the generated history',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Seed passed to populate_data, so datasets are identical between runs',
+        )
+        parser.add_argument(
+            '--only',
+            default='',
+            help='Comma-separated view names to run (default: all)',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Where to write the JSON results (default: bench-<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=None,
+            help='A previous JSON result file to compare p50 latencies against',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        only = {name for name in options['only'].split(',') if name}
+        output = options['output'] or time.strftime('bench-%Y%m%d-%H%M%S.json')
+        baseline = self.load_baseline(options['baseline'])
+
+        report = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {key: options[key] for key in ('sizes', 'repeat', 'days', 'classes_per_day', 'seed')},
+            'datasets': [],
+        }
+
+        # Failing views are reported in the results table; keep their
+        # tracebacks out of the output.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for size in sizes:
+                with temporary_database():
+                    report['datasets'].append(self.bench_dataset(size, options, only, baseline))
+        finally:
+            request_logger.setLevel(level)
+
+        with open(output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Benchmark completed, results written to {output}'))
+
+    def load_baseline(self, path):
+        """Return ``{(students, view): p50_ms}`` from an earlier result file."""
+        if not path:
+            return {}
+        try:
+            with open(path) as handle:
+                previous = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+        return {
+            (dataset['students'], result['view']): result['p50_ms']
+            for dataset in previous['datasets']
+            for result in dataset['views']
+            if 'p50_ms' in result
+        }
+
+    def bench_dataset(self, size, options, only, baseline):
+        # Primary keys repeat between throwaway databases; drop rosters cached for the last one.
+        roster_index.invalidate()
+        start = time.perf_counter()
+        call_command(
+            'populate_data',
+            students=size,
+            courses=max(11, size // 500),
+            days=options['days'],
+            classes_per_day=options['classes_per_day'],
+            full_rosters=True,
+            seed=options['seed'],
+            stdout=io.StringIO(),
+        )
+        dataset = {
+            'students': size,
+            'courses': Course.objects.count(),
+            'attendance_records': Attendance.objects.count(),
+            'setup_seconds': round(time.perf_counter() - start, 1),
+            'views': [],
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{size} students, {dataset["courses"]} courses, {dataset["attendance_records"]} attendance records '
+            f'(built in {dataset["setup_seconds"]}s)'
+        ))
+
+        # Benchmark the largest roster, and a student enrolled in it.
+        rosters = {
+            (department_id, level_id): students
+            for department_id, level_id, students in Student.objects.order_by().values_list(
+                'department', 'level'
+            ).annotate(students=Count('id'))
+        }
+        course = max(Course.objects.all(), key=lambda course: rosters.get((course.department_id, course.level_id), 0))
+        student = Student.objects.filter(department=course.department_id, level=course.level_id).first()
+        clients = {
+            'anonymous': bench_client(),
+            'student': bench_client(student.user),
+            'lecturer': bench_client(course.lecturer.user),
+            'admin': bench_client(Admin.objects.filter(role='admin').first().user),
+            'super_admin': bench_client(Admin.objects.filter(role='super_admin').first().user),
+        }
+
+        self.stdout.write(
+            f'{"view":<32} {"role":<12} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"peak KiB":>9}'
+        )
+        for name, role, method, url, payload in scenarios(course, student):
+            if only and name not in only:
+                continue
+            result = self.bench_view(clients[role], method, url, payload, name.endswith('_json'), options['repeat'])
+            result.update(view=name, role=role, url=url)
+            dataset['views'].append(result)
+
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f'{name:<32} {role:<12} {result["error"]}'))
+                continue
+            line = (
+                f'{name:<32} {role:<12} {result["status"]:>6} {result["p50_ms"]:>9.1f} {result["p95_ms"]:>9.1f} '
+                f'{result["queries"]:>8} {result["peak_kib"]:>9}'
+            )
+            previous = baseline.get((size, name))
+            if previous:
+                line += f'  ({(result["p50_ms"] - previous) / previous:+.0%} p50)'
+            self.stdout.write(line)
+        return dataset
+
+    def bench_view(self, client, method, url, payload, as_json, repeat):
+        """Time ``repeat`` requests after one warm-up, then measure peak memory on one more."""
+
+        def send(run):
+            if method == 'get':
+                return client.get(url)
+            if as_json:
+                return client.post(url, json.dumps(payload(run)), content_type='application/json')
+            return client.post(url, payload(run))
+
+        try:
+            response = send(0)
+            timings, queries = [], []
+            for run in range(1, repeat + 1):
+                with measure() as result:
+                    response = send(run)
+                timings.append(result['ms'])
+                queries.append(result['queries'])
+
+            # tracemalloc slows allocation down, so it only watches an untimed request.
+            tracemalloc.start()
+            try:
+                send(repeat + 1)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        except Exception as exc:
+            return {'error': f'{type(exc).__name__}: {exc}'}
+
+        return {
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': max(queries),
+            'peak_kib': peak // 1024,
+        }
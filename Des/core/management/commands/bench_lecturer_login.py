@@ -0,0 +1,202 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.bench import temporary_database, create_cohort, percentile
+from core.forms import LecturerLoginForm
+from core.models import Lecturer, User, normalize_login_name
+
+PASSWORD = 'bench123'
+
+
+class LegacyLecturerLoginForm(LecturerLoginForm):
+    """The lookup the login form used before core.logins, for comparison."""
+
+    def clean(self):
+        username = self.cleaned_data.get('username')
+        password = self.cleaned_data.get('password')
+        if username and password:
+            try:
+                lecturer = Lecturer.objects.get(user__first_name__icontains=username)
+            except Lecturer.DoesNotExist:
+                raise forms.ValidationError('Lecturer not found')
+            user = authenticate(username=lecturer.user.username, password=password)
+            if user is None:
+                raise forms.ValidationError('Invalid credentials')
+            self.user_cache = user
+        return self.cleaned_data
+
+
+MODES = {
+    'legacy': LegacyLecturerLoginForm,
+    'indexed': LecturerLoginForm,
+}
+
+
+def create_lecturers(count, department):
+    """Bulk create ``count`` lecturers named "Dr. Lect00001" and so on; returns the names they type."""
+    password_hash = make_password(PASSWORD)
+    users = User.objects.bulk_create([
+        User(
+            username=f'lect{n:05d}@bench.edu',
+            email=f'lect{n:05d}@bench.edu',
+            first_name=f'Dr. Lect{n:05d}',
+            last_name='Bench',
+            user_type='lecturer',
+            password=password_hash,
+        )
+        for n in range(count)
+    ])
+    users = User.objects.filter(username__in=[user.username for user in users])
+    Lecturer.objects.bulk_create([
+        Lecturer(
+            user=user,
+            employee_id=f'BL{user.pk:07d}',
+            department=department,
+            login_name=normalize_login_name(user.first_name),
+        )
+        for user in users
+    ])
+    return [user.first_name.split(' ', 1)[1] for user in users]
+
+
+def login_storm(form_class, attempts):
+    """Submit every ``(name, known)`` attempt at once, one thread each; returns ``(latency, known, ok)`` tuples."""
+    barrier = threading.Barrier(len(attempts))
+
+    def attempt(name, known):
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            ok = form_class(data={'username': name, 'password': PASSWORD}).is_valid()
+        except Exception:
+            ok = False
+        finally:
+            elapsed = time.perf_counter() - start
+            connection.close()
+        return elapsed, known, ok
+
+    with ThreadPoolExecutor(max_workers=len(attempts)) as pool:
+        return list(pool.map(lambda item: attempt(*item), attempts))
+
+
+def login_alone(form_class, name):
+    """Latency of one attempt with nothing else running."""
+    start = time.perf_counter()
+    form_class(data={'username': name, 'password': PASSWORD}).is_valid()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare lecturer login lookups under bursts of concurrent attempts against a large users table '
+        '(runs in a throwaway database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50000,
+            help='Rows in the users table',
+        )
+        parser.add_argument(
+            '--lecturers',
+            type=int,
+            default=500,
+            help='How many of those users are lecturers',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Login attempts submitted at once in each burst',
+        )
+        parser.add_argument(
+            '--bursts',
+            type=int,
+            default=5,
+            help='Bursts per lookup',
+        )
+        parser.add_argument(
+            '--unknown-share',
+            type=float,
+            default=0.25,
+            help='Share of attempts with a name that matches no lecturer (typos)',
+        )
+        parser.add_argument(
+            '--real-hasher',
+            action='store_true',
+            help="Keep the project's password hasher; by default a fast one isolates the lookup cost",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Seed for the attempt mix',
+        )
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {
+            'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+        }
+        # A file database, so every request thread has its own connection like server workers.
+        with tempfile.TemporaryDirectory() as directory, override_settings(**hashers):
+            with temporary_database(name=os.path.join(directory, 'bench_login.sqlite3')):
+                self.run(options)
+        self.stdout.write(self.style.SUCCESS('Login benchmark completed'))
+
+    def run(self, options):
+        course = create_cohort(max(0, options['users'] - options['lecturers'] - 1), 'LOGIN', password=PASSWORD)
+        names = create_lecturers(options['lecturers'], course.department)
+        # A few distinct typos, retried the way people retry a failed login.
+        typos = [f'Lecturer{n}' for n in range(20)]
+        rng = random.Random(options['seed'])
+        bursts = [
+            [
+                (rng.choice(typos), False) if rng.random() < options['unknown_share'] else (rng.choice(names), True)
+                for _ in range(options['concurrency'])
+            ]
+            for _ in range(options['bursts'])
+        ]
+
+        self.stdout.write(
+            f'{User.objects.count()} users, {Lecturer.objects.count()} lecturers, '
+            f'{options["bursts"]} bursts of {options["concurrency"]} concurrent logins '
+            f'({options["unknown_share"]:.0%} unknown names)'
+        )
+        self.stdout.write(
+            f'{"lookup":<8} {"names":<8} {"ok":>6} {"alone ms":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"max ms":>8} {"logins/s":>9}'
+        )
+        for mode, form_class in MODES.items():
+            cache.clear()
+            results, elapsed = [], 0.0
+            for attempts in bursts:
+                start = time.perf_counter()
+                results += login_storm(form_class, attempts)
+                elapsed += time.perf_counter() - start
+            for label, known in (('known', True), ('unknown', False)):
+                latencies = [latency * 1000 for latency, is_known, ok in results if is_known == known]
+                ok = sum(1 for latency, is_known, success in results if is_known == known and success)
+                if not latencies:
+                    continue
+                alone = [
+                    login_alone(form_class, name) * 1000 for name, is_known in bursts[0][:100] if is_known == known
+                ]
+                self.stdout.write(
+                    f'{mode:<8} {label:<8} {ok:>6} {percentile(alone, 50):>9.2f} {percentile(latencies, 50):>8.1f} '
+                    f'{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {max(latencies):>8.1f} '
+                    f'{len(results) / elapsed:>9.0f}'
+                )
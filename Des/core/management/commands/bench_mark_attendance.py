@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.bench import temporary_database, bench_client, create_cohort, measure, median
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the mark_attendance POST as the roster grows (runs in a throwaway database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='50,500,5000',
+            help='Comma-separated roster sizes to benchmark',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of timed POSTs per roster size and phase',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        with temporary_database():
+            self.stdout.write(f'{"students":>10} {"phase":>8} {"queries":>8} {"ms":>10} {"ms/student":>11}')
+            for size in sizes:
+                course = create_cohort(size, str(size))
+                client = bench_client(course.lecturer.user)
+                url = reverse('mark_attendance', args=[course.id])
+                student_ids = list(course.department.student_set.values_list('id', flat=True))
+
+                # The first POST of each day inserts the roster, later ones update it.
+                for phase, day in (('insert', None), ('update', 0)):
+                    timings, queries = [], []
+                    for run in range(options['repeat']):
+                        attendance_date = date(2024, 1, 1 + (run if day is None else day))
+                        data = {'date': attendance_date.isoformat()}
+                        for student_id in student_ids:
+                            data[f'status_{student_id}'] = 'present' if (student_id + run) % 3 else 'late'
+                            data[f'notes_{student_id}'] = ''
+                        with measure() as result:
+                            response = client.post(url, data)
+                        if response.status_code != 302:
+                            self.stderr.write(self.style.ERROR(f'Unexpected status {response.status_code}'))
+                            return
+                        timings.append(result['ms'])
+                        queries.append(result['queries'])
+
+                    ms = median(timings)
+                    self.stdout.write(
+                        f'{size:>10} {phase:>8} {max(queries):>8} {ms:>10.1f} {ms / size:>11.3f}'
+                    )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completed'))
@@ -0,0 +1,181 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.bench import temporary_database, create_cohort, percentile, wsgi_request
+from core.models import Student
+
+PASSWORD = 'bench123'
+
+# mode: (SESSION_ENGINE, entry of settings.SESSION_CACHES or None)
+MODES = {
+    'db': ('django.contrib.sessions.backends.db', None),
+    'cached_db-memory': ('core.sessions', 'memory'),
+    'cached_db-file': ('core.sessions', 'file'),
+}
+
+
+class SessionQueryCounter:
+    """Count queries on the django_session table from every thread's connections."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        # Fired on every reconnect of a thread's connection, which keeps its wrappers.
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self.install, dispatch_uid='bench_sessions')
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(dispatch_uid='bench_sessions')
+
+
+def run_pool(threads, function, items):
+    """Call ``function`` on every item from ``threads`` threads; returns the results and elapsed seconds."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(function, items))
+    return results, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare session storage modes on a burst of logins followed by authenticated requests '
+        '(runs in a throwaway database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=2000,
+            help='Students logging in at once',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=10000,
+            help='Authenticated requests sent after the logins, spread over the sessions',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Request threads of the simulated threaded WSGI server',
+        )
+        parser.add_argument(
+            '--view',
+            default='student_dashboard',
+            help='URL name of the authenticated page requested',
+        )
+        parser.add_argument(
+            '--modes',
+            default=','.join(MODES),
+            help=f'Comma-separated session modes to compare: {", ".join(MODES)}',
+        )
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+
+        # A fast hasher keeps password checks from hiding the session cost.
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with tempfile.TemporaryDirectory() as directory, override_settings(PASSWORD_HASHERS=hashers):
+            with temporary_database(name=os.path.join(directory, 'bench_sessions.sqlite3')):
+                create_cohort(options['users'], 'SESS', password=PASSWORD)
+                emails = list(Student.objects.values_list('user__email', flat=True))
+                self.stdout.write(
+                    f'{len(emails)} logins, then {options["requests"]} requests to {options["view"]} '
+                    f'from {options["threads"]} threads'
+                )
+                self.stdout.write(
+                    f'{"mode":<18} {"phase":<9} {"ok":>6} {"req/s":>7} {"p50 ms":>8} {"p95 ms":>8} '
+                    f'{"session queries/req":>20}'
+                )
+                for mode in modes:
+                    self.run_mode(mode, emails, directory, options)
+        self.stdout.write(self.style.SUCCESS('Session benchmark completed'))
+
+    def run_mode(self, mode, emails, directory, options):
+        engine, cache_name = MODES[mode]
+        caches_setting = dict(settings.CACHES)
+        if cache_name:
+            caches_setting['sessions'] = dict(settings.SESSION_CACHES[cache_name])
+            if cache_name == 'file':
+                caches_setting['sessions']['LOCATION'] = os.path.join(directory, 'sessions')
+
+        with override_settings(SESSION_ENGINE=engine, CACHES=caches_setting):
+            Session.objects.all().delete()
+            caches['sessions'].clear()
+            handler = WSGIHandler()
+            csrf = get_random_string(32)
+            login_path = reverse('student_login')
+            view_path = reverse(options['view'])
+
+            def login(email):
+                body = urlencode({'email': email, 'password': PASSWORD, 'csrfmiddlewaretoken': csrf}).encode()
+                start = time.perf_counter()
+                status, headers, content = wsgi_request(
+                    handler, 'POST', login_path, f'csrftoken={csrf}', body, 'application/x-www-form-urlencoded'
+                )
+                elapsed = time.perf_counter() - start
+                cookie = SimpleCookie()
+                for name, value in headers:
+                    if name == 'Set-Cookie':
+                        cookie.load(value)
+                session = cookie.get(settings.SESSION_COOKIE_NAME)
+                return elapsed, status == 302 and session is not None, session and session.value
+
+            def visit(session_key):
+                start = time.perf_counter()
+                status, headers, content = wsgi_request(
+                    handler, 'GET', view_path, f'{settings.SESSION_COOKIE_NAME}={session_key}'
+                )
+                return time.perf_counter() - start, status == 200, None
+
+            with SessionQueryCounter() as counter:
+                results, elapsed = run_pool(options['threads'], login, emails)
+            self.report(mode, 'login', results, elapsed, counter.count)
+
+            sessions = [session_key for latency, ok, session_key in results if ok]
+            if not sessions:
+                return
+            requests = [sessions[n % len(sessions)] for n in range(options['requests'])]
+            with SessionQueryCounter() as counter:
+                results, elapsed = run_pool(options['threads'], visit, requests)
+            self.report(mode, 'requests', results, elapsed, counter.count)
+
+    def report(self, mode, phase, results, elapsed, session_queries):
+        latencies = [latency * 1000 for latency, ok, extra in results]
+        ok = sum(1 for latency, success, extra in results if success)
+        self.stdout.write(
+            f'{mode:<18} {phase:<9} {ok:>6} {len(results) / elapsed:>7.0f} {percentile(latencies, 50):>8.1f} '
+            f'{percentile(latencies, 95):>8.1f} {session_queries / len(results):>20.2f}'
+        )
@@ -0,0 +1,153 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from core.bench import temporary_database, create_cohort
+from core.models import Attendance, ArchivedAttendance, Lecturer, Student
+from core.timetables import group_query, lecturer_query
+
+# Tables whose plans must never fall back to a full scan.
+CHECKED_TABLES = (
+    'core_attendance', 'core_archivedattendance', 'core_timetable', 'core_student', 'core_lecturer', 'core_user',
+)
+
+
+def view_queries(course):
+    """The hot queries of core/views.py as ``label: (queryset, expected index)``."""
+    student = Student.objects.filter(department=course.department, level=course.level).first()
+    today = date(2024, 1, 1)
+    month_ago = today - timedelta(days=30)
+    return {
+        'lecturer_login: name or employee ID': (
+            Lecturer.objects.filter(Q(login_name='bench') | Q(employee_id='BEMPPLAN'))
+            .order_by().values_list('employee_id', 'user__username'),
+            'core_lecturer_login_name_12703ac9',
+        ),
+        'student_dashboard: recent attendance': (
+            Attendance.objects.filter(student=student).order_by('-date', 'id')[:11],
+            'attendance_student_date_idx',
+        ),
+        # The timetable queries only run when the cached week is missing (core/timetables.py).
+        'timetables: department and level week': (
+            group_query(student.department_id, student.level_id).order_by(),
+            'timetable_dept_level_day_idx',
+        ),
+        'timetables: lecturer week': (
+            lecturer_query(course.lecturer_id).order_by(),
+            'core_timetable_course_id_db41cc97',
+        ),
+        'attendance_history: records': (
+            Attendance.objects.filter(student=student).order_by('-date', 'id'),
+            'attendance_student_date_idx',
+        ),
+        'attendance_history: totals': (
+            Attendance.objects.filter(student=student)
+            .order_by().values_list('course_id', 'status').annotate(total=Count('id')),
+            'attendance_student_course_idx',
+        ),
+        'mark_attendance: roster': (
+            Student.objects.filter(department=course.department_id, level=course.level_id),
+            'student_dept_level_idx',
+        ),
+        'mark_attendance: summary refresh': (
+            Attendance.objects.filter(course=course, date=today)
+            .order_by().values_list('status').annotate(total=Count('id')),
+            'attendance_course_date_idx',
+        ),
+        'attendance_reports: course and date range': (
+            Attendance.objects.filter(
+                course_id=course.id, date__gte=month_ago, date__lte=today
+            ).order_by('-date', 'course__code', 'id'),
+            'attendance_course_date_idx',
+        ),
+        'attendance_reports: department and date range': (
+            Attendance.objects.filter(
+                course__department_id=course.department_id, date__gte=month_ago, date__lte=today
+            ).order_by('-date', 'course__code', 'id'),
+            'attendance_course_date_idx',
+        ),
+        'attendance_reports: level and date range': (
+            Attendance.objects.filter(
+                course__level_id=course.level_id, date__gte=month_ago
+            ).order_by('-date', 'course__code', 'id'),
+            'attendance_course_date_idx',
+        ),
+        'attendance_reports: date range': (
+            Attendance.objects.filter(date__gte=month_ago, date__lte=today).order_by('-date', 'course__code', 'id'),
+            'attendance_date_idx',
+        ),
+        # Past semesters (core/archive.py).
+        'archive: newest archived date': (
+            ArchivedAttendance.objects.order_by('-date').values_list('date')[:1],
+            'archive_date_idx',
+        ),
+        'archive: student history': (
+            ArchivedAttendance.objects.filter(student=student).order_by('-date', 'id'),
+            'archive_student_date_idx',
+        ),
+        'archive: student totals': (
+            ArchivedAttendance.objects.filter(student=student)
+            .order_by().values_list('course_id', 'status').annotate(total=Count('id')),
+            'archive_student_course_idx',
+        ),
+        'archive: course and date range': (
+            ArchivedAttendance.objects.filter(
+                course_id=course.id, date__gte=month_ago, date__lte=today
+            ).order_by('-date', 'course__code', 'id'),
+            'archive_course_date_idx',
+        ),
+        'archive: restore one day': (
+            ArchivedAttendance.objects.filter(course=course, date=today),
+            'archive_course_date_idx',
+        ),
+    }
+
+
+def full_scans(plan):
+    """Return the plan lines that scan a checked table without an index."""
+    offending = []
+    for line in plan.splitlines():
+        match = re.search(r'\bSCAN (\w+)', line)
+        if match and match.group(1) in CHECKED_TABLES and 'USING' not in line:
+            offending.append(line.strip(' -|`'))
+    return offending
+
+
+class Command(BaseCommand):
+    help = "Assert with EXPLAIN that the views' hot queries use indexes (runs in a throwaway database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full query plan of every query',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The plan checks are written for SQLite query plans.')
+
+        failures = []
+        with temporary_database():
+            course = create_cohort(50, 'PLAN')
+            for label, (queryset, index) in view_queries(course).items():
+                plan = queryset.explain()
+                offending = full_scans(plan)
+                if index not in plan:
+                    offending.append(f'expected index {index} is not used')
+                if offending:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FAIL {label}'))
+                    for line in offending:
+                        self.stdout.write(f'     {line}')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {label}'))
+                if options['verbose_plans']:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries do not use their intended index')
+        self.stdout.write(self.style.SUCCESS('All checked queries use an index'))
@@ -0,0 +1,83 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.eligibility import load_cohort, compute_eligibility, csv_rows, ELIGIBILITY_COLUMNS, ELIGIBILITY_THRESHOLD
+from core.exports import stream_csv
+from core.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        'List students whose attendance in a course is below the exam eligibility threshold, '
+        'computed for the whole cohort at once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day of the semester (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last day of the semester (YYYY-MM-DD)')
+        parser.add_argument('--department', help='Only courses of this department code')
+        parser.add_argument('--level', type=int, help='Only courses of this level number')
+        parser.add_argument('--course', help='Only this course code')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=ELIGIBILITY_THRESHOLD,
+            help='Attendance percentage needed to be eligible',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='List every enrolled student, not only those below the threshold',
+        )
+        parser.add_argument(
+            '--csv',
+            metavar='PATH',
+            help='Write the list as CSV to PATH ("-" for standard output) instead of a table',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['threshold'] <= 100:
+            raise CommandError('--threshold must be between 0 and 100')
+        courses = Course.objects.all()
+        if options['department']:
+            courses = courses.filter(department__code=options['department'])
+        if options['level'] is not None:
+            courses = courses.filter(level__level_number=options['level'])
+        if options['course']:
+            courses = courses.filter(code=options['course'])
+
+        start = time.perf_counter()
+        cohort = load_cohort(courses, options['date_from'], options['date_to'])
+        loaded = time.perf_counter()
+        report = compute_eligibility(cohort, options['threshold'])
+        computed = time.perf_counter()
+        rows = report.rows(ineligible_only=not options['all'])
+
+        if options['csv']:
+            chunks = stream_csv(csv_rows(rows), columns=ELIGIBILITY_COLUMNS)
+            if options['csv'] == '-':
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending='')
+            else:
+                with open(options['csv'], 'w', newline='') as output:
+                    output.writelines(chunks)
+        else:
+            self.stdout.write(
+                f'{"course":<10} {"matric number":<15} {"student":<30} {"attended":>9} {"%":>6}  eligible'
+            )
+            for row in rows:
+                self.stdout.write(
+                    f'{row["course_code"]:<10} {row["matric_number"]:<15} {row["name"][:30]:<30} '
+                    f'{row["attended"]:>4}/{row["held"]:<4} {row["percentage"]:>6.1f}  '
+                    f'{"yes" if row["eligible"] else "no"}'
+                )
+
+        # Keep the summary off standard output when the CSV is written there.
+        summary = sys.stderr if options['csv'] == '-' else self.stdout
+        summary.write(
+            f'{report.ineligible_count} of {len(report)} enrolments below {options["threshold"]:g}% '
+            f'in {len(report.course_totals())} courses; loaded {len(cohort)} attendance rows in '
+            f'{(loaded - start) * 1000:.0f} ms, computed in {(computed - loaded) * 1000:.0f} ms\n'
+        )
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.journal import flush_journal, journal_lag, SCAN_FLUSH_BATCH, SCAN_JOURNAL_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the scans journaled with SCAN_WRITE_MODE=journal to the database in batches, '
+        'carrying on from the last committed position after a crash (run it beside the server)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the journal is empty instead of waiting for new scans',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0.2,
+            help='Seconds to wait for new scans when the journal is empty',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SCAN_FLUSH_BATCH,
+            help='Scans written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Flushing {SCAN_JOURNAL_DIR} (lag {journal_lag():.1f}s)')
+        flushed = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                written = flush_journal(options['batch_size'])
+                flushed += written
+                if written and options['verbosity'] > 1:
+                    self.stdout.write(f'  {written} scans written, lag {journal_lag():.2f}s')
+                if not written:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {flushed} journaled scans in {elapsed:.1f}s; lag {journal_lag():.1f}s'
+        ))
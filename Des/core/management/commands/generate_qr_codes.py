@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.models import Student
+from core.qr import qr_filename, render_student_qr
+
+
+class Command(BaseCommand):
+    help = 'Render the QR code images of students that do not have one yet, using a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes rendering images (1 renders in-process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of students fetched and updated per batch',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size']
+        pending = Student.objects.filter(Q(qr_code='') | Q(qr_code__isnull=True)).order_by('pk')
+
+        start = time.perf_counter()
+        rendered = reused = 0
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            last_pk = 0
+            while True:
+                batch = list(
+                    pending.filter(pk__gt=last_pk).values_list('pk', 'student_id', 'matric_number')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+
+                filenames = {}
+                to_render = []
+                for pk, student_id, matric_number in batch:
+                    filename = qr_filename(student_id)
+                    if default_storage.exists(filename):
+                        # Rendered earlier (on demand or by an interrupted run).
+                        filenames[student_id] = filename
+                        reused += 1
+                    else:
+                        to_render.append((student_id, matric_number))
+
+                chunksize = max(1, len(to_render) // (workers * 4))
+                results = pool.map(render_student_qr, to_render, chunksize=chunksize) if pool else map(render_student_qr, to_render)
+                for student_id, png in results:
+                    filenames[student_id] = default_storage.save(qr_filename(student_id), ContentFile(png))
+                    rendered += 1
+
+                Student.objects.bulk_update(
+                    [Student(pk=pk, qr_code=filenames[student_id]) for pk, student_id, matric_number in batch],
+                    ['qr_code'],
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        rate = rendered / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} QR codes ({reused} already on disk) in {elapsed:.1f}s ({rate:.0f}/s)'
+        ))
@@ -0,0 +1,56 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import import_students, IMPORT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = (
+        f'Import students from a CSV file with the columns {", ".join(IMPORT_COLUMNS)}, '
+        'inserting them in bulk; rows already imported are skipped'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument(
+            '--password',
+            help='Initial password of every imported student (by default they cannot log in until it is reset)',
+        )
+        parser.add_argument('--encoding', default='utf-8-sig', help='Encoding of the CSV file')
+        parser.add_argument(
+            '--qr',
+            choices=['skip', 'pool'],
+            default='skip',
+            help='skip: render QR codes on first view; pool: render them now with generate_qr_codes',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes used by --qr pool (defaults to the CPU count)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_students(file, options['password'], options['encoding'])
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, message in report.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if report.rejected > len(report.errors):
+            self.stderr.write(f'... and {report.rejected - len(report.errors)} more rejected rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} students ({report.skipped} already imported, {report.rejected} rejected) '
+            f'from {report.rows} rows in {report.elapsed:.1f}s ({report.rate:,.0f} rows/s)'
+        ))
+        if report.stopped:
+            raise CommandError(report.stopped)
+
+        if options['qr'] == 'pool':
+            qr_options = {}
+            if options['workers']:
+                qr_options['workers'] = options['workers']
+            call_command('generate_qr_codes', stdout=self.stdout, **qr_options)
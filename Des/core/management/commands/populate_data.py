@@ -1,18 +1,35 @@
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.constants import OnConflict
 from django.utils import timezone
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import timedelta
+import itertools
 import random
+import time
 
 from core.models import (
-    Department, Level, Student, Lecturer, Course, 
-    Timetable, Attendance, Admin
+    Department, Level, Student, Lecturer, Course,
+    Timetable, Attendance, ArchivedAttendance, AttendanceSummary, Admin, normalize_login_name
 )
+from core.counters import reconcile_counts
+from core.timetables import forget_timetables
+from core.summary import rebuild_summary
 
 User = get_user_model()
 
+FIRST_NAMES = ['John', 'Jane', 'Michael', 'Sarah', 'David', 'Emily', 'James', 'Jessica', 'Robert', 'Ashley']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez']
+
+# SQLite page cache (KiB) used while attendance is inserted.
+ATTENDANCE_CACHE_KIB = 256 * 1024
+
 class Command(BaseCommand):
-    help = 'Populate the database with sample data for demonstration'
+    help = 'Populate the database with sample data for demonstration (or large synthetic datasets for benchmarking)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -20,51 +37,157 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before populating',
         )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=50,
+            help='Number of students to create',
+        )
+        parser.add_argument(
+            '--courses',
+            type=int,
+            default=11,
+            help='Number of courses; courses beyond the 11 sample ones are generated',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Number of past days to record attendance for (weekdays only)',
+        )
+        parser.add_argument(
+            '--classes-per-day',
+            type=int,
+            default=3,
+            help='Number of courses that meet on each weekday',
+        )
+        parser.add_argument(
+            '--full-rosters',
+            action='store_true',
+            help='Mark every enrolled student in each class instead of a sample of 5-15',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows inserted per bulk insert',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed, so the same options always produce the same data',
+        )
+        parser.add_argument(
+            '--qr',
+            choices=['skip', 'pool'],
+            default='skip',
+            help='skip: render QR codes on first view; pool: render them now with generate_qr_codes',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes used by --qr pool (defaults to the CPU count)',
+        )
 
     def handle(self, *args, **options):
+        self.seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        self.batch_size = options['batch_size']
+        # Hashing is deliberately slow, so every synthetic account of a role
+        # shares one precomputed hash.
+        self.password_hashes = {
+            'admin': make_password('admin123'),
+            'lecturer': make_password('lecturer123'),
+            'student': make_password('student123'),
+        }
+
         if options['clear']:
             self.stdout.write(self.style.WARNING('Clearing existing data...'))
             self.clear_data()
 
-        self.stdout.write(self.style.SUCCESS('Starting data population...'))
-        
+        self.stdout.write(self.style.SUCCESS(f'Starting data population (seed {self.seed})...'))
+        started = time.perf_counter()
+
         # Create departments
         departments = self.create_departments()
         self.stdout.write(self.style.SUCCESS(f'Created {len(departments)} departments'))
-        
+
         # Create levels
         levels = self.create_levels()
         self.stdout.write(self.style.SUCCESS(f'Created {len(levels)} levels'))
-        
+
         # Create admin users
         admins = self.create_admins()
         self.stdout.write(self.style.SUCCESS(f'Created {len(admins)} admin users'))
-        
+
         # Create lecturers
-        lecturers = self.create_lecturers(departments)
-        self.stdout.write(self.style.SUCCESS(f'Created {len(lecturers)} lecturers'))
-        
+        lecturers = self.timed('lecturers', self.create_lecturers, departments, options['courses'])
+
         # Create courses
-        courses = self.create_courses(departments, levels, lecturers)
-        self.stdout.write(self.style.SUCCESS(f'Created {len(courses)} courses'))
-        
+        courses = self.timed('courses', self.create_courses, departments, levels, lecturers, options['courses'])
+
         # Create timetables
-        timetables = self.create_timetables(departments, levels, courses)
-        self.stdout.write(self.style.SUCCESS(f'Created {len(timetables)} timetable entries'))
-        
+        self.timed('timetable entries', self.create_timetables, courses)
+
         # Create students
-        students = self.create_students(departments, levels)
-        self.stdout.write(self.style.SUCCESS(f'Created {len(students)} students'))
-        
+        self.timed('students', self.create_students, departments, levels, options['students'])
+
         # Create attendance records
-        attendance_records = self.create_attendance_records(students, courses, lecturers)
-        self.stdout.write(self.style.SUCCESS(f'Created {len(attendance_records)} attendance records'))
-        
-        self.stdout.write(self.style.SUCCESS('Data population completed successfully!'))
+        attendance_count = self.timed(
+            'attendance records', self.create_attendance_records, courses,
+            options['days'], options['classes_per_day'], options['full_rosters'],
+        )
+
+        # Bulk inserts bypass the signal handlers, so derived data is rebuilt once.
+        with transaction.atomic():
+            summary_rows = rebuild_summary()
+        reconcile_counts()
+        forget_timetables()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt attendance summary ({summary_rows} rows) and dashboard counters'))
+
+        if options['qr'] == 'pool':
+            qr_options = {'batch_size': self.batch_size}
+            if options['workers']:
+                qr_options['workers'] = options['workers']
+            call_command('generate_qr_codes', stdout=self.stdout, **qr_options)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Data population completed successfully in {elapsed:.1f}s '
+            f'({attendance_count} attendance records)'
+        ))
+
+    def timed(self, label, create, *args):
+        """Run one creation step and report its throughput."""
+        start = time.perf_counter()
+        created = create(*args)
+        elapsed = time.perf_counter() - start
+        count = created if isinstance(created, int) else len(created)
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f'Created {count} {label} in {elapsed:.1f}s ({rate:,.0f} rows/s)'))
+        return created
+
+    def rng(self, step):
+        """A random generator per step, so reruns with the same seed and options
+        produce the same rows whatever already exists."""
+        return random.Random(f'{self.seed}:{step}')
+
+    def batches(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            batch = list(itertools.islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
 
     def clear_data(self):
         """Clear existing data"""
-        Attendance.objects.all().delete()
+        # Attendance can run to millions of rows; delete it with plain SQL
+        # instead of loading every row to send delete signals.
+        with connection.cursor() as cursor:
+            for model in (Attendance, ArchivedAttendance, AttendanceSummary):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
         Timetable.objects.all().delete()
         Course.objects.all().delete()
         Student.objects.all().delete()
@@ -84,7 +207,7 @@ class Command(BaseCommand):
             {'name': 'Biology', 'code': 'BIO'},
             {'name': 'Engineering', 'code': 'ENG'},
         ]
-        
+
         departments = []
         for data in dept_data:
             dept, created = Department.objects.get_or_create(
@@ -92,7 +215,7 @@ class Command(BaseCommand):
                 defaults={'name': data['name']}
             )
             departments.append(dept)
-        
+
         return departments
 
     def create_levels(self):
@@ -103,7 +226,7 @@ class Command(BaseCommand):
             {'name': 'Third Year', 'level_number': 300},
             {'name': 'Fourth Year', 'level_number': 400},
         ]
-        
+
         levels = []
         for data in level_data:
             level, created = Level.objects.get_or_create(
@@ -111,7 +234,7 @@ class Command(BaseCommand):
                 defaults={'name': data['name']}
             )
             levels.append(level)
-        
+
         return levels
 
     def create_admins(self):
@@ -132,7 +255,7 @@ class Command(BaseCommand):
                 'role': 'admin'
             },
         ]
-        
+
         admins = []
         for data in admin_data:
             user, created = User.objects.get_or_create(
@@ -144,12 +267,10 @@ class Command(BaseCommand):
                     'user_type': data['role'],
                     'is_staff': True,
                     'is_active': True,
+                    'password': self.password_hashes['admin'],
                 }
             )
-            if created:
-                user.set_password('admin123')
-                user.save()
-            
+
             admin, created = Admin.objects.get_or_create(
                 user=user,
                 defaults={
@@ -158,11 +279,36 @@ class Command(BaseCommand):
                 }
             )
             admins.append(admin)
-        
+
         return admins
 
-    def create_lecturers(self, departments):
-        """Create sample lecturers"""
+    def create_users(self, user_data, user_type):
+        """Bulk create users from ``(email, first_name, last_name)`` tuples, skipping existing emails.
+
+        Returns ``{email: user}`` for every email, new or existing.
+        """
+        users = {}
+        for batch in self.batches(user_data):
+            existing = User.objects.in_bulk([email for email, first_name, last_name in batch], field_name='email')
+            users.update(existing)
+            created = User.objects.bulk_create([
+                User(
+                    username=email,
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name,
+                    user_type=user_type,
+                    is_active=True,
+                    password=self.password_hashes[user_type],
+                )
+                for email, first_name, last_name in batch
+                if email not in existing
+            ])
+            users.update((user.email, user) for user in created)
+        return users
+
+    def create_lecturers(self, departments, course_count):
+        """Create sample lecturers, plus one more for every two courses beyond the sample ones"""
         lecturer_data = [
             {'first_name': 'Dr. Alice', 'last_name': 'Johnson', 'email': 'alice.johnson@university.edu', 'employee_id': 'EMP001'},
             {'first_name': 'Prof. Bob', 'last_name': 'Smith', 'email': 'bob.smith@university.edu', 'employee_id': 'EMP002'},
@@ -171,74 +317,91 @@ class Command(BaseCommand):
             {'first_name': 'Dr. Eve', 'last_name': 'Davis', 'email': 'eve.davis@university.edu', 'employee_id': 'EMP005'},
             {'first_name': 'Prof. Frank', 'last_name': 'Miller', 'email': 'frank.miller@university.edu', 'employee_id': 'EMP006'},
         ]
-        
-        lecturers = []
-        for i, data in enumerate(lecturer_data):
-            user, created = User.objects.get_or_create(
-                email=data['email'],
-                defaults={
-                    'username': data['email'],
-                    'first_name': data['first_name'],
-                    'last_name': data['last_name'],
-                    'user_type': 'lecturer',
-                    'is_active': True,
-                }
-            )
-            if created:
-                user.set_password('lecturer123')
-                user.save()
-            
-            lecturer, created = Lecturer.objects.get_or_create(
-                user=user,
-                defaults={
-                    'employee_id': data['employee_id'],
-                    'department': departments[i % len(departments)]
-                }
-            )
-            lecturers.append(lecturer)
-        
-        return lecturers
+        rng = self.rng('lecturers')
+        for n in range(len(lecturer_data) + 1, max(len(lecturer_data), course_count // 2) + 1):
+            lecturer_data.append({
+                'first_name': 'Dr. ' + rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+                'email': f'lecturer{n}@university.edu',
+                'employee_id': f'EMP{n:03d}',
+            })
 
-    def create_courses(self, departments, levels, lecturers):
-        """Create sample courses"""
+        users = self.create_users(
+            [(data['email'], data['first_name'], data['last_name']) for data in lecturer_data], 'lecturer'
+        )
+        existing = Lecturer.objects.in_bulk([data['employee_id'] for data in lecturer_data], field_name='employee_id')
+        Lecturer.objects.bulk_create(
+            [
+                Lecturer(
+                    user=users[data['email']],
+                    employee_id=data['employee_id'],
+                    department=departments[i % len(departments)],
+                    login_name=normalize_login_name(data['first_name']),
+                )
+                for i, data in enumerate(lecturer_data)
+                if data['employee_id'] not in existing
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return list(Lecturer.objects.filter(user__in=users.values()))
+
+    def create_courses(self, departments, levels, lecturers, course_count):
+        """Create sample courses, generating more when ``course_count`` asks for them"""
         course_data = [
             # Computer Science courses
             {'title': 'Introduction to Programming', 'code': 'CS101', 'dept_idx': 0, 'level_idx': 0, 'credit_units': 3},
             {'title': 'Data Structures', 'code': 'CS201', 'dept_idx': 0, 'level_idx': 1, 'credit_units': 3},
             {'title': 'Algorithms', 'code': 'CS301', 'dept_idx': 0, 'level_idx': 2, 'credit_units': 4},
             {'title': 'Software Engineering', 'code': 'CS401', 'dept_idx': 0, 'level_idx': 3, 'credit_units': 3},
-            
+
             # Mathematics courses
             {'title': 'Calculus I', 'code': 'MATH101', 'dept_idx': 1, 'level_idx': 0, 'credit_units': 3},
             {'title': 'Linear Algebra', 'code': 'MATH201', 'dept_idx': 1, 'level_idx': 1, 'credit_units': 3},
             {'title': 'Statistics', 'code': 'MATH301', 'dept_idx': 1, 'level_idx': 2, 'credit_units': 3},
-            
+
             # Physics courses
             {'title': 'General Physics I', 'code': 'PHY101', 'dept_idx': 2, 'level_idx': 0, 'credit_units': 4},
             {'title': 'Thermodynamics', 'code': 'PHY201', 'dept_idx': 2, 'level_idx': 1, 'credit_units': 3},
-            
+
             # Chemistry courses
             {'title': 'General Chemistry', 'code': 'CHEM101', 'dept_idx': 3, 'level_idx': 0, 'credit_units': 4},
             {'title': 'Organic Chemistry', 'code': 'CHEM201', 'dept_idx': 3, 'level_idx': 1, 'credit_units': 4},
         ]
-        
-        courses = []
+        rng = self.rng('courses')
+        course_data = course_data[:course_count]
+        for n in range(len(course_data), course_count):
+            dept_idx = n % len(departments)
+            level_idx = (n // len(departments)) % len(levels)
+            course_data.append({
+                'title': f'{departments[dept_idx].name} Topics {n}',
+                'code': f'{departments[dept_idx].code}{levels[level_idx].level_number // 100}{n:03d}',
+                'dept_idx': dept_idx,
+                'level_idx': level_idx,
+                'credit_units': rng.choice([2, 3, 4]),
+            })
         for data in course_data:
-            course, created = Course.objects.get_or_create(
-                code=data['code'],
-                defaults={
-                    'title': data['title'],
-                    'department': departments[data['dept_idx']],
-                    'level': levels[data['level_idx']],
-                    'lecturer': lecturers[random.randint(0, len(lecturers)-1)],
-                    'credit_units': data['credit_units']
-                }
-            )
-            courses.append(course)
-        
-        return courses
+            data['lecturer'] = rng.choice(lecturers)
+
+        existing = Course.objects.in_bulk([data['code'] for data in course_data], field_name='code')
+        Course.objects.bulk_create(
+            [
+                Course(
+                    code=data['code'],
+                    title=data['title'],
+                    department=departments[data['dept_idx']],
+                    level=levels[data['level_idx']],
+                    lecturer=data['lecturer'],
+                    credit_units=data['credit_units'],
+                )
+                for data in course_data
+                if data['code'] not in existing
+            ],
+            batch_size=self.batch_size,
+        )
+        return list(Course.objects.filter(code__in=[data['code'] for data in course_data]))
 
-    def create_timetables(self, departments, levels, courses):
+    def create_timetables(self, courses):
         """Create sample timetables"""
         days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
         times = [
@@ -248,121 +411,138 @@ class Command(BaseCommand):
             ('14:00', '16:00'),
             ('16:00', '18:00'),
         ]
-        
+
+        rng = self.rng('timetables')
         timetables = []
         for course in courses:
-            day = random.choice(days)
-            start_time, end_time = random.choice(times)
-            
-            timetable, created = Timetable.objects.get_or_create(
-                department=course.department,
-                level=course.level,
+            start_time, end_time = rng.choice(times)
+            timetables.append(Timetable(
+                department_id=course.department_id,
+                level_id=course.level_id,
                 course=course,
-                day=day,
-                defaults={
-                    'start_time': start_time,
-                    'end_time': end_time
-                }
-            )
-            if created:
-                timetables.append(timetable)
-        
-        return timetables
+                day=rng.choice(days),
+                start_time=start_time,
+                end_time=end_time,
+            ))
+
+        # Courses that already have an entry for the chosen day are left alone.
+        before = Timetable.objects.count()
+        Timetable.objects.bulk_create(timetables, batch_size=self.batch_size, ignore_conflicts=True)
+        return Timetable.objects.count() - before
 
-    def create_students(self, departments, levels):
+    def create_students(self, departments, levels, student_count):
         """Create sample students"""
-        first_names = ['John', 'Jane', 'Michael', 'Sarah', 'David', 'Emily', 'James', 'Jessica', 'Robert', 'Ashley']
-        last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez']
-        
-        students = []
-        student_count = 50
-        
+        rng = self.rng('students')
+        # Students are spread over the departments and years in turn, so the
+        # i-th student always gets the same student ID and matric number,
+        # whatever the seed. Matric numbers have four serial digits.
+        groups = [(department, year) for year in ['22', '23', '24'] for department in departments]
+        if student_count > len(groups) * 10000:
+            raise CommandError(f'At most {len(groups) * 10000} students fit the matric number format')
+        student_data = []
         for i in range(student_count):
-            first_name = random.choice(first_names)
-            last_name = random.choice(last_names)
-            department = random.choice(departments)
-            level = random.choice(levels)
-            
-            # Generate matric number
-            year = random.choice(['22', '23', '24'])
-            matric_number = f"{department.code}/{year}/{1000 + i:04d}"
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            level = rng.choice(levels)
+            department, year = groups[i % len(groups)]
+            matric_number = f"{department.code}/{year}/{i // len(groups):04d}"
             email = f"{first_name.lower()}.{last_name.lower()}{i}@student.university.edu"
-            
-            user, created = User.objects.get_or_create(
-                email=email,
-                defaults={
-                    'username': email,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'user_type': 'student',
-                    'is_active': True,
-                }
-            )
-            if created:
-                user.set_password('student123')
-                user.save()
-            
-            student, created = Student.objects.get_or_create(
-                matric_number=matric_number,
-                defaults={
-                    'user': user,
-                    'department': department,
-                    'level': level
-                }
+            student_data.append((email, first_name, last_name, matric_number, f'STU{i:08X}', department, level))
+
+        created = 0
+        for batch in self.batches(student_data):
+            # Students created by an earlier run, with this seed or another, are kept.
+            taken = Student.objects.filter(
+                Q(student_id__in=[row[4] for row in batch]) | Q(matric_number__in=[row[3] for row in batch])
+            ).values_list('student_id', 'matric_number')
+            taken = {value for row in taken for value in row}
+            batch = [row for row in batch if row[3] not in taken and row[4] not in taken]
+            users = self.create_users([(email, first, last) for email, first, last, *rest in batch], 'student')
+            existing = set(
+                Student.objects.filter(user__in=users.values()).values_list('user__email', flat=True)
             )
-            if created:
-                students.append(student)
-        
-        return students
+            students = Student.objects.bulk_create([
+                Student(
+                    user=users[email],
+                    matric_number=matric_number,
+                    student_id=student_id,
+                    department=department,
+                    level=level,
+                )
+                for email, first, last, matric_number, student_id, department, level in batch
+                if email not in existing
+            ])
+            created += len(students)
+
+        return created
 
-    def create_attendance_records(self, students, courses, lecturers):
+    def create_attendance_records(self, courses, days, classes_per_day, full_rosters):
         """Create sample attendance records"""
-        attendance_records = []
-        
-        # Create records for the last 30 days
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        current_date = start_date
-        while current_date <= end_date:
-            # Skip weekends
-            if current_date.weekday() < 5:  # Monday = 0, Friday = 4
-                # Randomly select some courses for today
-                daily_courses = random.sample(courses, min(3, len(courses)))
-                
-                for course in daily_courses:
-                    # Get students for this course's department and level
-                    course_students = [
-                        s for s in students 
-                        if s.department == course.department and s.level == course.level
-                    ]
-                    
-                    if course_students:
-                        # Randomly mark attendance for some students
-                        present_students = random.sample(
-                            course_students,
-                            min(random.randint(5, 15), len(course_students))
-                        )
-                        
-                        for student in present_students:
-                            status = random.choices(
-                                ['present', 'late', 'absent'],
-                                weights=[70, 20, 10]
-                            )[0]
-                            
-                            attendance, created = Attendance.objects.get_or_create(
-                                student=student,
-                                course=course,
-                                date=current_date,
-                                defaults={
-                                    'status': status,
-                                    'marked_by': course.lecturer,
-                                    'notes': random.choice(['', 'Good participation', 'Late due to traffic', '']) if status != 'absent' else ''
-                                }
+        rng = self.rng('attendance')
+        rosters = defaultdict(list)
+        for student_id, department_id, level_id in Student.objects.values_list('id', 'department_id', 'level_id'):
+            rosters[department_id, level_id].append(student_id)
+        marked_at = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        def records():
+            # Create records for the last ``days`` days
+            end_date = timezone.now().date()
+            current_date = end_date - timedelta(days=days)
+            while current_date <= end_date:
+                # Skip weekends
+                if current_date.weekday() < 5:  # Monday = 0, Friday = 4
+                    day = connection.ops.adapt_datefield_value(current_date)
+                    # Randomly select some courses for today
+                    daily_courses = rng.sample(courses, min(classes_per_day, len(courses)))
+
+                    for course in daily_courses:
+                        # Students of this course's department and level
+                        course_students = rosters[course.department_id, course.level_id]
+                        if not full_rosters:
+                            course_students = rng.sample(
+                                course_students,
+                                min(rng.randint(5, 15), len(course_students))
+                            )
+
+                        statuses = rng.choices(['present', 'late', 'absent'], weights=[70, 20, 10], k=len(course_students))
+                        notes = rng.choices(['', 'Good participation', 'Late due to traffic', ''], k=len(course_students))
+                        for student_id, status, note in zip(course_students, statuses, notes):
+                            yield (
+                                student_id, course.id, day, status, course.lecturer_id, marked_at,
+                                note if status != 'absent' else '',
                             )
-                            if created:
-                                attendance_records.append(attendance)
-            
-            current_date += timedelta(days=1)
-        
-        return attendance_records
\ No newline at end of file
+
+                current_date += timedelta(days=1)
+
+        # Rows are inserted as plain tuples: at millions of rows, compiling
+        # model instances in bulk_create costs more than the inserts
+        # themselves. Rows that already exist for a student, course and day
+        # are kept.
+        fields = ['student_id', 'course_id', 'date', 'status', 'marked_by_id', 'marked_at', 'notes']
+        columns = ', '.join(connection.ops.quote_name(Attendance._meta.get_field(name).column) for name in fields)
+        sql = (
+            f'{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} '
+            f'{connection.ops.quote_name(Attendance._meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            + connection.ops.on_conflict_suffix_sql(Attendance._meta.fields, OnConflict.IGNORE, None, None)
+        )
+
+        written = 0
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # The indexes are updated in random student order; a page cache
+                # that holds them roughly doubles the insert rate.
+                cursor.execute('PRAGMA cache_size')
+                cache_size = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA cache_size = -{ATTENDANCE_CACHE_KIB}')
+            try:
+                for batch in self.batches(records()):
+                    with transaction.atomic():
+                        cursor.executemany(sql, batch)
+                    # Rows the insert ignored are not counted.
+                    written += cursor.rowcount
+            finally:
+                if connection.vendor == 'sqlite':
+                    cursor.execute(f'PRAGMA cache_size = {cache_size}')
+
+        return written
@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions from the database in small batches, so logins are not blocked '
+        'behind one long delete (safe to run from cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Sessions deleted per transaction',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help='Seconds to wait between batches, leaving the write lock to requests',
+        )
+
+    def handle(self, *args, **options):
+        # Cached copies of these sessions expire on their own (see core/sessions.py).
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by()
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            # Sessions have no relations or delete signals, so this is a single DELETE.
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < options['batch_size']:
+                break
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
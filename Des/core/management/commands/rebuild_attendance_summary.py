@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the attendance summary table from the attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of summary rows inserted per statement',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = rebuild_summary(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt attendance summary with {created} rows'))
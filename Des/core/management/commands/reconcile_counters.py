@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached dashboard totals from the database (safe to run from cron)'
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for name, (cached, actual) in reconcile_counts().items():
+            if cached is None:
+                self.stdout.write(f'{name}: {actual} (was not cached)')
+            elif cached != actual:
+                drifted += 1
+                self.stdout.write(self.style.WARNING(f'{name}: {actual} (cached value was {cached})'))
+            else:
+                self.stdout.write(f'{name}: {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Counters reconciled, {drifted} had drifted'))
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from core.bench import temporary_database, bench_client, create_cohort, percentile, wsgi_request
+from core.models import Attendance, AttendanceSummary
+from core.roster import roster_index
+
+# Handlers process_qr_scan is served through.
+MODES = ('wsgi', 'asgi')
+
+
+class ThreadWatcher:
+    """Track the peak number of live threads while the block runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def wsgi_burst(path, cookie, bodies, rate, threads):
+    """Send ``bodies`` to a WSGIHandler at ``rate`` per second from a pool of ``threads`` server threads."""
+    handler = WSGIHandler()
+
+    def call(body, scheduled):
+        status, headers, content = wsgi_request(handler, 'POST', path, cookie, body, 'application/json')
+        return time.perf_counter() - scheduled, status == 200 and json.loads(content)['success']
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        futures = []
+        for index, body in enumerate(bodies):
+            scheduled = start + index / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(call, body, scheduled))
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+async def asgi_burst(path, cookie, bodies, rate):
+    """Send ``bodies`` to an ASGIHandler at ``rate`` per second, one task per connection."""
+    handler = ASGIHandler()
+
+    async def call(body, scheduled):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'POST',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'cookie', cookie.encode()),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 80),
+        }
+        finished = asyncio.Event()
+        pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'body': b''}
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+                if not message.get('more_body'):
+                    finished.set()
+
+        await handler(scope, receive, send)
+        return time.perf_counter() - scheduled, response['status'] == 200 and json.loads(response['body'])['success']
+
+    start = time.perf_counter()
+    tasks = []
+    for index, body in enumerate(bodies):
+        scheduled = start + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(call(body, scheduled)))
+    results = await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the QR scan endpoint under the WSGI and ASGI handlers with an open-loop burst of scans '
+        '(runs in a throwaway database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rate',
+            type=int,
+            default=500,
+            help='Scans sent per second',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Length of the burst in seconds',
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=2000,
+            help='Roster size of the scanned course',
+        )
+        parser.add_argument(
+            '--wsgi-threads',
+            type=int,
+            default=16,
+            help='Request threads of the simulated threaded WSGI server',
+        )
+        parser.add_argument(
+            '--modes',
+            default='wsgi,asgi',
+            help=f'Comma-separated deployments to compare: {", ".join(MODES)}',
+        )
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        rate = options['rate']
+        count = int(rate * options['duration'])
+
+        # A file database, so request threads share it like server workers do.
+        with tempfile.TemporaryDirectory() as directory:
+            with temporary_database(name=os.path.join(directory, 'scan_load.sqlite3')):
+                roster_index.invalidate()
+                course = create_cohort(options['students'], 'LOAD')
+                client = bench_client(course.lecturer.user)
+                cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+                payloads = cycle([
+                    json.dumps({'qr_data': f'STUDENT:{student_id}:{matric_number}'}).encode()
+                    for student_id, matric_number in course.department.student_set.values_list(
+                        'student_id', 'matric_number'
+                    )
+                ])
+
+                self.stdout.write(
+                    f'{count} scans at {rate}/s against a roster of {options["students"]} '
+                    f'(WSGI server threads: {options["wsgi_threads"]})'
+                )
+                self.stdout.write(
+                    f'{"mode":<10} {"ok":>6} {"failed":>7} {"req/s":>7} {"p50 ms":>8} {"p95 ms":>8} '
+                    f'{"p99 ms":>8} {"max ms":>8} {"threads":>8}'
+                )
+                for mode in modes:
+                    self.run_mode(mode, course, cookie, list(islice(payloads, count)), rate, options)
+
+        self.stdout.write(self.style.SUCCESS('Load comparison completed'))
+
+    def run_mode(self, mode, course, cookie, bodies, rate, options):
+        path = reverse('process_qr_scan', args=[course.id])
+
+        # Every mode starts from an empty attendance table and a warm roster.
+        with connection.cursor() as cursor:
+            for model in (Attendance, AttendanceSummary):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+        roster_index.get(course.id)
+
+        with ThreadWatcher() as threads:
+            if mode == 'wsgi':
+                results, elapsed = wsgi_burst(path, cookie, bodies, rate, options['wsgi_threads'])
+            else:
+                results, elapsed = asyncio.run(asgi_burst(path, cookie, bodies, rate))
+
+        latencies = [latency * 1000 for latency, ok in results]
+        ok = sum(1 for latency, success in results if success)
+        self.stdout.write(
+            f'{mode:<10} {ok:>6} {len(results) - ok:>7} {len(results) / elapsed:>7.0f} '
+            f'{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} '
+            f'{percentile(latencies, 99):>8.1f} {max(latencies):>8.1f} {threads.peak:>8}'
+        )
@@ -0,0 +1,292 @@
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import cycle
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.urls import reverse
+
+from core.bench import temporary_database, bench_client, create_cohort, percentile, wsgi_request
+from core.journal import flush_journal, journal_lag
+from core.models import User, Attendance, AttendanceSummary
+from core.roster import roster_index
+from core.summary import rebuild_summary
+
+
+def connect_client(name):
+    """Point this process at the database file ``name`` and return a WSGI handler with its URLconf loaded."""
+    connection.close()
+    connection.settings_dict['NAME'] = name
+    # Busy answers are counted, not logged.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    handler = WSGIHandler()
+    wsgi_request(handler, 'GET', '/')
+    return handler
+
+
+def scanner_client(name, course_id, path, cookie, bodies, barrier, duration):
+    """One lecture hall's scanner, run in its own process.
+
+    Posts ``bodies`` in turn, each once the previous answer arrived, for
+    ``duration`` seconds after every client is ready. Returns
+    ``(scans recorded, 503 answers, other failures, latencies)``.
+    """
+    handler = connect_client(name)
+    roster_index.get(course_id)
+    barrier.wait()
+
+    recorded = busy = failed = 0
+    latencies = []
+    end = time.perf_counter() + duration
+    for body in cycle(bodies):
+        start = time.perf_counter()
+        if start >= end:
+            break
+        status, headers, content = wsgi_request(handler, 'POST', path, cookie, body, 'application/json')
+        latencies.append(time.perf_counter() - start)
+        if status == 200 and json.loads(content)['success']:
+            recorded += 1
+        elif status == 503:
+            busy += 1
+        else:
+            failed += 1
+    connection.close()
+    return recorded, busy, failed, latencies
+
+
+def flusher_client(name, barrier, duration):
+    """``flush_scan_journal`` for the write-behind runs; returns the largest journal lag it saw, in seconds."""
+    connect_client(name)
+    barrier.wait()
+
+    lag = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        lag = max(lag, journal_lag())
+        if not flush_journal():
+            time.sleep(0.05)
+    connection.close()
+    return lag
+
+
+@contextmanager
+def environment(**values):
+    """Set environment variables for the processes spawned in the block."""
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                del os.environ[key]
+            else:
+                os.environ[key] = value
+
+
+def reader_client(name, path, cookie, barrier, duration):
+    """An admin downloading ``path`` over and over while the scanners write.
+
+    Returns ``(downloads completed, downloads that failed)``.
+    """
+    handler = connect_client(name)
+    barrier.wait()
+
+    reads = failed = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        try:
+            status, headers, content = wsgi_request(handler, 'GET', path, cookie)
+        except OperationalError:
+            # Raised while the export streams, after the view returned.
+            status = None
+            connection.close()
+        if status == 200:
+            reads += 1
+        else:
+            failed += 1
+    connection.close()
+    return reads, failed
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent QR scanners and report readers, one process each, against every database profile, '
+        'and report sustained writes per second and "database is locked" errors (runs in a throwaway database)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=8,
+            help='Scanners writing at once, each for its own course in its own process',
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=2,
+            help='Processes downloading the attendance CSV export at the same time',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds each profile is loaded for',
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=200,
+            help='Roster size of each scanned course',
+        )
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=20,
+            help='Days of past attendance per course, read by the exports',
+        )
+        parser.add_argument(
+            '--write-mode',
+            choices=['direct', 'journal'],
+            default='direct',
+            help='SCAN_WRITE_MODE of the scanners; journal adds a flusher process',
+        )
+        parser.add_argument(
+            '--profiles',
+            default=','.join(settings.DATABASE_PROFILES),
+            help=f'Comma-separated DATABASE_PROFILES to compare: {", ".join(settings.DATABASE_PROFILES)}',
+        )
+
+    def handle(self, *args, **options):
+        profiles = [profile for profile in options['profiles'].split(',') if profile]
+        unknown = set(profiles) - set(settings.DATABASE_PROFILES)
+        if unknown:
+            raise CommandError(f'Unknown profiles: {", ".join(sorted(unknown))}')
+        clients = options['clients']
+
+        # A file database, so that the client processes share it.
+        with tempfile.TemporaryDirectory() as directory:
+            with temporary_database(name=os.path.join(directory, 'stress_scans.sqlite3')):
+                scanners = []
+                for index in range(clients):
+                    course = create_cohort(options['students'], f'HALL{index}')
+                    client = bench_client(course.lecturer.user)
+                    students = list(
+                        course.department.student_set.values_list('id', 'student_id', 'matric_number')
+                    )
+                    Attendance.objects.bulk_create([
+                        Attendance(
+                            student_id=student, course=course, date=date.today() - timedelta(days=day),
+                            status='present', marked_by=course.lecturer,
+                        )
+                        for day in range(1, options['history_days'] + 1)
+                        for student, student_id, matric_number in students
+                    ], batch_size=5000)
+                    scanners.append((
+                        course.id,
+                        reverse('process_qr_scan', args=[course.id]),
+                        f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}',
+                        [
+                            json.dumps({'qr_data': f'STUDENT:{student_id}:{matric_number}'}).encode()
+                            for student, student_id, matric_number in students
+                        ],
+                    ))
+                rebuild_summary()
+                admin = User.objects.create(username='stress.admin@bench.edu', user_type='admin')
+                client = bench_client(admin)
+                reader = (
+                    f'{reverse("attendance_reports")}?export=csv',
+                    f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}',
+                )
+
+                self.stdout.write(
+                    f'{clients} scanner and {options["readers"]} reader processes for {options["duration"]:g}s '
+                    f'per profile, rosters of {options["students"]}, {Attendance.objects.count()} past rows, '
+                    f'{options["write_mode"]} scan writes'
+                )
+                self.stdout.write(
+                    f'{"profile":<12} {"scans":>7} {"locked":>7} {"failed":>7} {"writes/s":>9} '
+                    f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} {"exports":>8} {"exp fail":>9} '
+                    f'{"lag s":>6}'
+                )
+                dropped = {
+                    profile: self.run_profile(profile, scanners, [reader] * options['readers'], directory, options)
+                    for profile in profiles
+                }
+
+        if dropped.get(settings.DATABASE_PROFILE):
+            raise CommandError(
+                f'The {settings.DATABASE_PROFILE} profile (DATABASE_PROFILE) dropped '
+                f'{dropped[settings.DATABASE_PROFILE]} scans and exports'
+            )
+        self.stdout.write(self.style.SUCCESS('Stress test completed'))
+
+    def run_profile(self, profile, scanners, readers, directory, options):
+        """Load the database through ``profile``'s settings; returns the number of scans and exports that failed."""
+        # Every profile starts without today's scans and in Django's default
+        # journal mode; the profile's connections switch it if they use another.
+        with connection.cursor() as cursor:
+            for model in (Attendance, AttendanceSummary):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} WHERE date = %s', [
+                    connection.ops.adapt_datefield_value(date.today())
+                ])
+            cursor.execute('PRAGMA journal_mode = DELETE')
+        name = connection.settings_dict['NAME']
+        connection.close()
+
+        journaled = options['write_mode'] == 'journal'
+        journal_dir = os.path.join(directory, f'journal-{profile}')
+        flushers = 1 if journaled else 0
+        clients = len(scanners) + len(readers) + flushers
+        # Spawned processes read these settings from the environment as they start.
+        with environment(
+            DATABASE_PROFILE=profile, SCAN_WRITE_MODE=options['write_mode'], SCAN_JOURNAL_DIR=journal_dir
+        ):
+            context = multiprocessing.get_context('spawn')
+            with context.Manager() as manager, ProcessPoolExecutor(
+                max_workers=clients, mp_context=context, initializer=django.setup
+            ) as pool:
+                barrier = manager.Barrier(clients + 1)
+                scans = [
+                    pool.submit(scanner_client, name, *scanner, barrier, options['duration'])
+                    for scanner in scanners
+                ]
+                reads = [
+                    pool.submit(reader_client, name, *reader, barrier, options['duration'])
+                    for reader in readers
+                ]
+                flush = [pool.submit(flusher_client, name, barrier, options['duration']) for _ in range(flushers)]
+                barrier.wait()
+                start = time.perf_counter()
+                results = [future.result() for future in scans]
+                elapsed = time.perf_counter() - start
+                exports = [future.result() for future in reads]
+                lag = max((future.result() for future in flush), default=None)
+        if journaled:
+            # Scans acknowledged after the flusher stopped.
+            while flush_journal(directory=journal_dir):
+                pass
+
+        recorded = sum(result[0] for result in results)
+        busy = sum(result[1] for result in results)
+        failed = sum(result[2] for result in results)
+        latencies = [latency * 1000 for result in results for latency in result[3]]
+        self.stdout.write(
+            f'{profile:<12} {recorded:>7} {busy:>7} {failed:>7} {recorded / elapsed:>9.0f} '
+            f'{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} '
+            f'{percentile(latencies, 99):>8.1f} {max(latencies, default=0):>8.1f} '
+            f'{sum(result[0] for result in exports):>8} {sum(result[1] for result in exports):>9} '
+            f'{"-" if lag is None else f"{lag:.2f}":>6}'
+        )
+        return busy + failed + sum(result[1] for result in exports)
@@ -0,0 +1,254 @@
+"""In-process request metrics, exposed in the Prometheus text format.
+
+``RequestMetricsMiddleware`` records every request's latency under its URL
+name. A sampled share of requests (``METRICS_SAMPLE_RATE``) is also
+instrumented for query count, database time and template render time;
+unsampled requests only pay a context variable lookup per query, so the
+rate can be lowered under load. Metrics live in the process that served
+the request, so each worker exposes its own.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_format_labels(labels)} {_format_value(value)}'
+
+
+class Gauge:
+    """A value read from ``function`` whenever the metrics are scraped."""
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} gauge'
+        yield f'{self.name} {_format_value(self.function())}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count.
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            snapshot = sorted(
+                (key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items()
+            )
+        for labels, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(labels)} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation, function):
+        return self.register(Gauge(name, documentation, function))
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.collect()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter('attendance_requests_total', 'Requests served, by URL name and status code.')
+REQUEST_LATENCY = registry.histogram('attendance_request_duration_seconds', 'Request latency by URL name.')
+REQUEST_QUERIES = registry.histogram(
+    'attendance_request_queries', 'Database queries per sampled request, by URL name.', QUERY_BUCKETS
+)
+REQUEST_DB_TIME = registry.histogram(
+    'attendance_request_db_seconds', 'Time spent in database queries per sampled request, by URL name.'
+)
+REQUEST_TEMPLATE_TIME = registry.histogram(
+    'attendance_request_template_seconds', 'Template render time per sampled request, by URL name.'
+)
+
+
+class RequestSample:
+    """Query and template timings gathered while one sampled request runs."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+# The sample of the request being served. Context variables follow the
+# request into sync_to_async threads, so async views are measured too.
+_current_sample = contextvars.ContextVar('metrics_sample', default=None)
+
+
+def sample_query(execute, sql, params, many, context):
+    """``execute_wrapper`` installed on every connection; times queries of sampled requests."""
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_time += time.perf_counter() - start
+        sample.queries += 1
+
+
+def install_query_sampler(sender, connection, **kwargs):
+    if sample_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sample_query)
+
+
+connection_created.connect(install_query_sampler, dispatch_uid='core.metrics.install_query_sampler')
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = _current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for sampled requests."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = self.start_sample()
+        token = _current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+        self.record(request, response, time.perf_counter() - start, sample)
+        return response
+
+    async def __acall__(self, request):
+        sample = self.start_sample()
+        token = _current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+        self.record(request, response, time.perf_counter() - start, sample)
+        return response
+
+    def start_sample(self):
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            return RequestSample()
+        return None
+
+    def record(self, request, response, elapsed, sample):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        REQUESTS.inc(view=view, status=response.status_code)
+        REQUEST_LATENCY.observe(elapsed, view=view)
+        if sample is not None:
+            REQUEST_QUERIES.observe(sample.queries, view=view)
+            REQUEST_DB_TIME.observe(sample.db_time, view=view)
+            REQUEST_TEMPLATE_TIME.observe(sample.template_time, view=view)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:31
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate_summary(apps, schema_editor):
+    Attendance = apps.get_model('core', 'Attendance')
+    AttendanceSummary = apps.get_model('core', 'AttendanceSummary')
+    totals = Attendance.objects.order_by().values_list('course_id', 'date', 'status').annotate(total=Count('id'))
+    AttendanceSummary.objects.bulk_create(
+        [
+            AttendanceSummary(course_id=course_id, date=day, status=status, count=total)
+            for course_id, day, status, total in totals
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.course')),
+            ],
+            options={
+                'ordering': ['-date', 'course'],
+                'unique_together': {('course', 'date', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
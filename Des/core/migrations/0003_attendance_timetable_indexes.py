@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', '-date'], name='attendance_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', '-date'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['department', 'level'], name='student_dept_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['department', 'level', 'day', 'start_time'], name='timetable_dept_level_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['course', 'day', 'start_time'], name='timetable_course_day_idx'),
+        ),
+    ]
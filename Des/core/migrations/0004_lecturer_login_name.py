@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:02
+
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copy of core.models.normalize_login_name as of this migration.
+LOGIN_NAME_TITLES = {'dr', 'prof', 'mr', 'mrs', 'ms', 'miss', 'engr'}
+
+
+def normalize_login_name(name):
+    words = unicodedata.normalize('NFKC', name or '').casefold().split()
+    while len(words) > 1 and words[0].rstrip('.') in LOGIN_NAME_TITLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def fill_login_names(apps, schema_editor):
+    Lecturer = apps.get_model('core', 'Lecturer')
+    lecturers = list(Lecturer.objects.select_related('user'))
+    for lecturer in lecturers:
+        lecturer.login_name = normalize_login_name(lecturer.user.first_name)
+    Lecturer.objects.bulk_update(lecturers, ['login_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_attendance_timetable_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturer',
+            name='login_name',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_login_names, migrations.RunPython.noop),
+    ]
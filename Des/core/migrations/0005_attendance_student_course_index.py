@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_lecturer_login_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'course', 'status'], name='attendance_student_course_idx'),
+        ),
+    ]
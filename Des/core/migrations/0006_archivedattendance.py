@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_attendance_student_course_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late')], default='absent', max_length=10)),
+                ('marked_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.course')),
+                ('marked_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.lecturer')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.student')),
+            ],
+            options={
+                'verbose_name_plural': 'archived attendance',
+                'ordering': ['-date', 'student__matric_number'],
+                'indexes': [models.Index(fields=['student', '-date'], name='archive_student_date_idx'), models.Index(fields=['student', 'course', 'status'], name='archive_student_course_idx'), models.Index(fields=['course', '-date'], name='archive_course_date_idx'), models.Index(fields=['-date'], name='archive_date_idx')],
+                'unique_together': {('student', 'course', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_archivedattendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanJournalCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(max_length=100, unique=True)),
+                ('offset', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
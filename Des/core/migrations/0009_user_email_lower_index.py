@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:51
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_user_username_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='core_user_email_lower'),
+        ),
+    ]
@@ -1,12 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
-import qrcode
-from io import BytesIO
-from django.core.files import File
-from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.functions import Lower
+import unicodedata
 import uuid
 
+from .qr import qr_payload, qr_filename, render_qr_png
+
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
         ('student', 'Student'),
@@ -20,6 +22,13 @@ class User(AbstractUser):
     
     def __str__(self):
         return f"{self.username} - {self.user_type}"
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive username and email lookups (see core.importers).
+            models.Index(Lower('username'), name='core_user_username_lower'),
+            models.Index(Lower('email'), name='core_user_email_lower'),
+        ]
 
 class Department(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -54,32 +63,56 @@ class Student(models.Model):
     def save(self, *args, **kwargs):
         if not self.student_id:
             self.student_id = f"STU{str(uuid.uuid4())[:8].upper()}"
-        if not self.qr_code:
-            self.generate_qr_code()
+        # The QR image is rendered on first use (ensure_qr_code) or by the
+        # generate_qr_codes command, never while saving.
         super().save(*args, **kwargs)
     
+    def ensure_qr_code(self):
+        """Make sure the QR image exists on disk, rendering it only if needed."""
+        if self.qr_code and default_storage.exists(self.qr_code.name):
+            return
+        filename = qr_filename(self.student_id)
+        if default_storage.exists(filename):
+            self.qr_code = filename
+        else:
+            self.generate_qr_code()
+        Student.objects.filter(pk=self.pk).update(qr_code=self.qr_code.name)
+    
     def generate_qr_code(self):
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(f"STUDENT:{self.student_id}:{self.matric_number}")
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        
-        filename = f'qr_code_{self.student_id}.png'
-        self.qr_code.save(filename, File(buffer), save=False)
+        png = render_qr_png(qr_payload(self.student_id, self.matric_number))
+        self.qr_code = default_storage.save(qr_filename(self.student_id), ContentFile(png))
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.matric_number}"
     
     class Meta:
         ordering = ['matric_number']
+        indexes = [
+            # Course rosters: every student of a department and level.
+            models.Index(fields=['department', 'level'], name='student_dept_level_idx'),
+        ]
+
+# Titles dropped from the front of a lecturer's first name for login.
+LOGIN_NAME_TITLES = {'dr', 'prof', 'mr', 'mrs', 'ms', 'miss', 'engr'}
+
+def normalize_login_name(name):
+    """Lower-case a name for login lookups, collapsing spaces and dropping a leading title (Dr., Prof., ...)."""
+    words = unicodedata.normalize('NFKC', name or '').casefold().split()
+    while len(words) > 1 and words[0].rstrip('.') in LOGIN_NAME_TITLES:
+        words = words[1:]
+    return ' '.join(words)
 
 class Lecturer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='lecturer_profile')
     employee_id = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    # normalize_login_name() of the user's first name, kept in sync on save
+    # and by core.signals when the user is renamed (see core.logins).
+    login_name = models.CharField(max_length=150, blank=True, default='', editable=False, db_index=True)
+    
+    def save(self, *args, **kwargs):
+        self.login_name = normalize_login_name(self.user.first_name)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.employee_id}"
@@ -125,6 +158,12 @@ class Timetable(models.Model):
     class Meta:
         ordering = ['day', 'start_time']
         unique_together = ['department', 'level', 'course', 'day']
+        indexes = [
+            # Student timetables: a department and level, optionally one day, by time.
+            models.Index(fields=['department', 'level', 'day', 'start_time'], name='timetable_dept_level_day_idx'),
+            # Lecturer timetables: the lecturer's courses on one day.
+            models.Index(fields=['course', 'day', 'start_time'], name='timetable_course_day_idx'),
+        ]
 
 class Attendance(models.Model):
     STATUS_CHOICES = (
@@ -147,6 +186,75 @@ class Attendance(models.Model):
     class Meta:
         ordering = ['-date', 'student__matric_number']
         unique_together = ['student', 'course', 'date']
+        indexes = [
+            # A student's history, newest first.
+            models.Index(fields=['student', '-date'], name='attendance_student_date_idx'),
+            # A student's totals per course and status, counted from the index alone.
+            models.Index(fields=['student', 'course', 'status'], name='attendance_student_course_idx'),
+            # One course on one day or over a date range (marking, summaries, reports).
+            models.Index(fields=['course', '-date'], name='attendance_course_date_idx'),
+            # Date-range reports across all courses.
+            models.Index(fields=['-date'], name='attendance_date_idx'),
+        ]
+
+class ArchivedAttendance(models.Model):
+    """Attendance of past semesters, moved out of ``Attendance`` by ``core.archive``.
+    
+    Rows keep their ``Attendance`` id and columns, so both tables can be
+    read as one.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.STATUS_CHOICES, default='absent')
+    marked_by = models.ForeignKey(Lecturer, on_delete=models.CASCADE)
+    marked_at = models.DateTimeField()
+    notes = models.TextField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.student.matric_number} - {self.course.code} - {self.date} - {self.status}"
+    
+    class Meta:
+        ordering = ['-date', 'student__matric_number']
+        unique_together = ['student', 'course', 'date']
+        verbose_name_plural = 'archived attendance'
+        # The indexes of Attendance, for the same reads.
+        indexes = [
+            models.Index(fields=['student', '-date'], name='archive_student_date_idx'),
+            models.Index(fields=['student', 'course', 'status'], name='archive_student_course_idx'),
+            models.Index(fields=['course', '-date'], name='archive_course_date_idx'),
+            models.Index(fields=['-date'], name='archive_date_idx'),
+        ]
+
+class AttendanceSummary(models.Model):
+    """Per course, date and status attendance counts.
+
+    Kept in step with ``Attendance`` by ``core.summary`` so reports can read
+    headline numbers without scanning the attendance history.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.course.code} - {self.date} - {self.status}: {self.count}"
+    
+    class Meta:
+        ordering = ['-date', 'course']
+        unique_together = ['course', 'date', 'status']
+
+class ScanJournalCheckpoint(models.Model):
+    """How far one segment of the scan journal has been written to ``Attendance``.
+
+    Advanced by ``core.journal`` in the same transaction as the attendance
+    it wrote, so a flusher that crashes resumes where its last commit ended.
+    """
+    segment = models.CharField(max_length=100, unique=True)
+    offset = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.segment}: {self.offset}"
 
 class Admin(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='admin_profile')
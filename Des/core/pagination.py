@@ -0,0 +1,111 @@
+"""Keyset (seek) pagination.
+
+Instead of OFFSET, each page is fetched with a WHERE clause that continues
+after the last row of the previous page, so page N costs the same as page 1.
+The ordering must end in a unique field (normally ``id``).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPaginator:
+    def __init__(self, ordering, page_size=50):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    def page(self, queryset, cursor=None):
+        """Return ``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+        return self.trim(self.rows(queryset, cursor))
+
+    def page_merged(self, querysets, cursor=None):
+        """``page`` over several querysets of rows with the same fields (such as a table and its archive)."""
+        rows = []
+        for queryset in querysets:
+            rows += self.rows(queryset, cursor)
+        # Sorting on the last field first leaves rows in the full ordering.
+        for field in reversed(self.ordering):
+            name = field.lstrip('-')
+            rows.sort(key=lambda row: self.value(row, name), reverse=field.startswith('-'))
+        return self.trim(rows)
+
+    def rows(self, queryset, cursor):
+        """Up to one more row than a page, starting after ``cursor``."""
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode(cursor, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(self.after(values))
+        return list(queryset[:self.page_size + 1])
+
+    def trim(self, rows):
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = self.encode(rows[-1])
+        return rows, next_cursor
+
+    def after(self, values):
+        """Build the "comes after ``values``" condition for the ordering."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, value in zip(self.ordering[:index], values):
+                clause &= Q(**{previous.lstrip('-'): value})
+            condition |= clause
+        return condition
+
+    @staticmethod
+    def value(row, name):
+        for attribute in name.split('__'):
+            row = getattr(row, attribute)
+        return row
+
+    def encode(self, row):
+        values = []
+        for field in self.ordering:
+            value = self.value(row, field.lstrip('-'))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def field(self, model, name):
+        *relations, name = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def decode(self, cursor, model=None):
+        """The values in ``cursor``, or None (the first page) if it is not one of ours.
+
+        With ``model``, each value is converted to the type of its ordering
+        field, so an edited cursor cannot reach the query as the wrong type.
+        """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, binascii.Error):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        if model is None:
+            return values
+        converted = []
+        for field, value in zip(self.ordering, values):
+            if value is None or isinstance(value, (list, dict)):
+                return None
+            # SQLite cannot bind an integer wider than 64 bits.
+            if isinstance(value, int) and not -2**63 <= value < 2**63:
+                return None
+            try:
+                converted.append(self.field(model, field.lstrip('-')).clean(value, None))
+            except (ValidationError, TypeError, ValueError):
+                return None
+        return converted
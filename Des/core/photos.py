@@ -0,0 +1,69 @@
+"""Attendance from classroom photos of student QR cards.
+
+A lecturer uploads a few photos, each showing many cards. Each photo is
+decoded by ``core.qr.decode_qr_payloads`` in a pool of worker processes, and
+the codes found in all of them go through one ``record_scans`` call, so a
+class of 200 is a single bulk write instead of 200 scans.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .attendance import record_scans
+from .qr import decode_qr_payloads
+
+# Upper bound on photos accepted in one upload.
+MAX_SCAN_PHOTOS = 10
+
+QR_PHOTO_MAX_BYTES = getattr(settings, 'QR_PHOTO_MAX_BYTES', 15 * 1024 * 1024)
+
+QR_PHOTO_WORKERS = getattr(settings, 'QR_PHOTO_WORKERS', os.cpu_count() or 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def photo_pool():
+    """The decoding processes shared by every upload of this process, or None to decode in-process.
+
+    Spawned rather than forked, like the card export's pool (see
+    ``core.cards.card_pool``).
+    """
+    global _pool
+    if QR_PHOTO_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=QR_PHOTO_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def decode_photos(photos):
+    """The QR payloads found in each photo (bytes), in order; None for a photo that is not an image.
+
+    Raises ImportError when the zbar library is not installed.
+    """
+    # Fail here rather than once in every worker.
+    from pyzbar import pyzbar  # noqa: F401
+
+    pool = photo_pool()
+    # A single photo gains nothing from the pool but would be copied to it.
+    if pool is None or len(photos) == 1:
+        return [decode_qr_payloads(photo) for photo in photos]
+    return list(pool.map(decode_qr_payloads, photos))
+
+
+def record_photo_scans(roster, marked_by_id, photos):
+    """Mark every enrolled student whose card shows in ``photos``.
+
+    Returns ``(codes, results)``: the payloads found in each photo (None
+    for an unreadable one) and one ``record_scans`` result per distinct
+    payload, in the order they were found.
+    """
+    codes = decode_photos(photos)
+    # A card in several photos is recorded, and reported, once.
+    payloads = list(dict.fromkeys(payload for found in codes if found for payload in found))
+    return codes, record_scans(roster, marked_by_id, payloads)
@@ -0,0 +1,154 @@
+"""QR code rendering for student ID codes and printable ID cards, and decoding of photos of them.
+
+The rendering and decoding functions are pure (bytes in, bytes out) so they
+can be run in worker processes by ``generate_qr_codes``, the card export
+(``core.cards``) and photo scanning (``core.photos``) as well as on demand.
+"""
+import zlib
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+QR_UPLOAD_DIR = 'qr_codes'
+
+
+def qr_payload(student_id, matric_number):
+    return f"STUDENT:{student_id}:{matric_number}"
+
+
+def qr_filename(student_id):
+    return f'{QR_UPLOAD_DIR}/qr_code_{student_id}.png'
+
+
+def render_qr_png(payload):
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_student_qr(item):
+    """Process-pool entry point: ``(student_id, matric_number)`` -> ``(student_id, png)``."""
+    student_id, matric_number = item
+    return student_id, render_qr_png(qr_payload(student_id, matric_number))
+
+
+# A CR80 ID card (85.6 x 54 mm) and an A4 sheet of ten of them, at 300 dpi.
+CARD_SIZE = (1011, 638)
+SHEET_SIZE = (2480, 3508)
+SHEET_COLUMNS, SHEET_ROWS = 2, 5
+CARDS_PER_SHEET = SHEET_COLUMNS * SHEET_ROWS
+
+
+@lru_cache(maxsize=None)
+def _font(size, bold=False):
+    try:
+        return ImageFont.truetype('DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf', size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def render_qr_image(payload, size):
+    """The QR code of ``payload`` as a ``size`` pixel square grayscale image."""
+    qr = qrcode.QRCode(border=2)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white").convert('L').resize(
+        (size, size), Image.Resampling.NEAREST
+    )
+
+
+def render_card(card):
+    """One grayscale ID card for ``(student_id, matric_number, name, department, level_number)``."""
+    student_id, matric_number, name, department, level_number = card
+    width, height = CARD_SIZE
+    image = Image.new('L', CARD_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width - 1, height - 1), outline=160, width=2)
+    draw.rectangle((0, 0, width - 1, 90), fill=40)
+    draw.text((40, 45), 'STUDENT ID CARD', font=_font(44, bold=True), fill=255, anchor='lm')
+
+    qr_size = height - 150
+    image.paste(render_qr_image(qr_payload(student_id, matric_number), qr_size), (width - qr_size - 30, 120))
+
+    text_width = width - qr_size - 100
+    lines = [
+        (name, (46, 40, 34), True),
+        (matric_number, (40,), False),
+        (department, (30, 26), False),
+        (f'Level {level_number}', (30,), False),
+        (student_id, (26,), False),
+    ]
+    y = 150
+    for text, sizes, bold in lines:
+        # The largest size that fits, then the smallest size shortened with an ellipsis.
+        for size in sizes:
+            font = _font(size, bold)
+            if draw.textlength(text, font=font) <= text_width:
+                break
+        while text and draw.textlength(text, font=font) > text_width:
+            text = text[:-2] + '\u2026'
+        draw.text((40, y), text, font=font, fill=0)
+        y += sizes[0] + 32
+    return image
+
+
+def render_card_pngs(cards):
+    """Process-pool entry point: a batch of cards -> ``(matric_number, png)`` per card, in order."""
+    pngs = []
+    for card in cards:
+        buffer = BytesIO()
+        render_card(card).save(buffer, format='PNG')
+        pngs.append((card[1], buffer.getvalue()))
+    return pngs
+
+
+def render_card_sheet(cards):
+    """Process-pool entry point: up to ``CARDS_PER_SHEET`` cards laid out on one A4 sheet.
+
+    Returns the sheet's 8-bit grayscale pixels, zlib-compressed (a PDF
+    ``FlateDecode`` image stream).
+    """
+    sheet = Image.new('L', SHEET_SIZE, 255)
+    card_width, card_height = CARD_SIZE
+    left = (SHEET_SIZE[0] - SHEET_COLUMNS * card_width) // 2
+    top = (SHEET_SIZE[1] - SHEET_ROWS * card_height) // 2
+    for n, card in enumerate(cards):
+        row, column = divmod(n, SHEET_COLUMNS)
+        sheet.paste(render_card(card), (left + column * card_width, top + row * card_height))
+    # Sheets are mostly white, so the fastest level compresses them almost as well.
+    return zlib.compress(sheet.tobytes(), 1)
+
+
+# Photos are decoded at each of these scales. Codes that are out of focus at
+# full resolution, or too large for zbar's finder, often read once shrunk.
+PHOTO_DECODE_SCALES = (1, 0.5)
+
+
+def decode_qr_payloads(image_bytes):
+    """Process-pool entry point: the text of every QR code in a photo, or None if it is not an image.
+
+    pyzbar is imported here so that rendering does not need the zbar library.
+    """
+    from pyzbar.pyzbar import ZBarSymbol, decode
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as photo:
+            photo = photo.convert('L')
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    payloads = {}
+    for scale in PHOTO_DECODE_SCALES:
+        image = photo
+        if scale != 1:
+            image = photo.resize((round(photo.width * scale), round(photo.height * scale)), Image.Resampling.BOX)
+        for symbol in decode(image, symbols=[ZBarSymbol.QRCODE]):
+            payloads.setdefault(symbol.data.decode('utf-8', 'replace'), None)
+    return list(payloads)
@@ -0,0 +1,126 @@
+"""Process-local roster index for the QR scan hot path.
+
+Each entry maps a course's students by ``student_id`` so a scan can be
+validated without touching the database. Entries are built on first use,
+kept in a bounded LRU, dropped by the signal handlers in ``core.signals``
+whenever a student, user or course changes, and expire after
+``ROSTER_INDEX_TTL`` seconds so that changes made by other worker processes
+are picked up eventually.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from .models import Course, Student
+
+RosterStudent = namedtuple('RosterStudent', ['pk', 'matric_number', 'full_name'])
+
+
+class Roster:
+    """The enrolled students of one course, keyed by ``student_id``."""
+
+    def __init__(self, course_id, department_id, level_id, lecturer_id, lecturer_user_id, students, user_ids):
+        self.course_id = course_id
+        self.department_id = department_id
+        self.level_id = level_id
+        self.lecturer_id = lecturer_id
+        self.lecturer_user_id = lecturer_user_id
+        self.students = students
+        self.user_ids = user_ids
+        self.built_at = time.monotonic()
+
+    def lookup(self, student_id, matric_number):
+        """Return the ``RosterStudent`` matching a scanned payload, or None."""
+        student = self.students.get(student_id)
+        if student is None or student.matric_number != matric_number:
+            return None
+        return student
+
+
+class RosterIndex:
+    def __init__(self, max_courses=128, ttl=300):
+        self.max_courses = max_courses
+        self.ttl = ttl
+        self._rosters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, course_id):
+        """Return the ``Roster`` for ``course_id``, or None if there is no such course."""
+        with self._lock:
+            roster = self._rosters.get(course_id)
+            if roster is not None:
+                if time.monotonic() - roster.built_at < self.ttl:
+                    self._rosters.move_to_end(course_id)
+                    return roster
+                del self._rosters[course_id]
+
+        roster = self.build(course_id)
+        if roster is None:
+            return None
+
+        with self._lock:
+            self._rosters[course_id] = roster
+            self._rosters.move_to_end(course_id)
+            while len(self._rosters) > self.max_courses:
+                self._rosters.popitem(last=False)
+        return roster
+
+    def build(self, course_id):
+        course = Course.objects.filter(id=course_id).values(
+            'department_id', 'level_id', 'lecturer_id', 'lecturer__user_id'
+        ).first()
+        if course is None:
+            return None
+
+        students = {}
+        user_ids = set()
+        rows = Student.objects.filter(
+            department_id=course['department_id'],
+            level_id=course['level_id'],
+        ).values_list('student_id', 'id', 'matric_number', 'user_id', 'user__first_name', 'user__last_name')
+        for student_id, pk, matric_number, user_id, first_name, last_name in rows:
+            students[student_id] = RosterStudent(pk, matric_number, f'{first_name} {last_name}'.strip())
+            user_ids.add(user_id)
+
+        return Roster(
+            course_id,
+            course['department_id'],
+            course['level_id'],
+            course['lecturer_id'],
+            course['lecturer__user_id'],
+            students,
+            frozenset(user_ids),
+        )
+
+    def invalidate(self, course_id=None):
+        """Drop one course's roster, or every roster when ``course_id`` is None."""
+        with self._lock:
+            if course_id is None:
+                self._rosters.clear()
+            else:
+                self._rosters.pop(course_id, None)
+
+    def invalidate_student(self, student):
+        """Drop rosters that list ``student`` or that it now belongs to."""
+        with self._lock:
+            for course_id, roster in list(self._rosters.items()):
+                if (
+                    student.student_id in roster.students
+                    or (roster.department_id == student.department_id and roster.level_id == student.level_id)
+                ):
+                    del self._rosters[course_id]
+
+    def invalidate_user(self, user_id):
+        """Drop rosters that include the student with this user account."""
+        with self._lock:
+            for course_id, roster in list(self._rosters.items()):
+                if user_id in roster.user_ids:
+                    del self._rosters[course_id]
+
+
+roster_index = RosterIndex(
+    max_courses=getattr(settings, 'ROSTER_INDEX_MAX_COURSES', 128),
+    ttl=getattr(settings, 'ROSTER_INDEX_TTL', 300),
+)
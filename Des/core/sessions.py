@@ -0,0 +1,39 @@
+"""Session engine for ``SESSION_MODE = 'cached_db'``.
+
+Django's cached_db backend: a session is read from the cache and only falls
+back to the ``django_session`` table on a miss, and every write goes to
+both, so a lost cache never logs anyone out. Django caches a session for
+its whole remaining lifetime. This engine caps that at
+``SESSION_CACHE_TTL`` seconds. A per-process memory cache cannot see a
+logout or a new login handled by another worker, and the cap bounds how
+long such a copy is served.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+SESSION_CACHE_TTL = getattr(settings, 'SESSION_CACHE_TTL', 300)
+
+
+class CappedCache:
+    """Cache wrapper whose ``set`` never keeps an entry longer than ``ttl`` seconds."""
+
+    def __init__(self, cache, ttl):
+        self.cache = cache
+        self.ttl = ttl
+
+    def set(self, key, value, timeout=None, version=None):
+        if timeout is None or timeout > self.ttl:
+            timeout = self.ttl
+        self.cache.set(key, value, timeout, version=version)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = CappedCache(self._cache, SESSION_CACHE_TTL)
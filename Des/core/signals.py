@@ -0,0 +1,149 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .archive import restore_before_write
+from .counters import increment_on_commit
+from .events import publish_attendance_on_commit
+from .logins import forget_misses
+from .models import (
+    User, Department, Level, Student, Lecturer, Admin, Course, Timetable, Attendance, ArchivedAttendance,
+    normalize_login_name,
+)
+from .roster import roster_index
+from .summary import apply_delta
+from .timetables import forget_timetables_on_commit
+
+# Fields whose changes never affect a cached roster (login bookkeeping).
+ROSTER_IRRELEVANT_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_student_rosters(sender, instance, **kwargs):
+    roster_index.invalidate_student(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_rosters(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= ROSTER_IRRELEVANT_USER_FIELDS:
+        return
+    roster_index.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def sync_lecturer_login_name(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= ROSTER_IRRELEVANT_USER_FIELDS):
+        return
+    login_name = normalize_login_name(instance.first_name)
+    if Lecturer.objects.filter(user_id=instance.pk).exclude(login_name=login_name).update(login_name=login_name):
+        forget_misses()
+
+
+@receiver(post_save, sender=Lecturer)
+def forget_lecturer_login_misses(sender, instance, created, **kwargs):
+    # A new lecturer may carry a name that was remembered as unknown.
+    if created:
+        forget_misses()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_roster(sender, instance, **kwargs):
+    roster_index.invalidate(instance.pk)
+
+
+@receiver(pre_save, sender=Attendance)
+def restore_archived_day(sender, instance, **kwargs):
+    # A new row for a day of a past semester joins the rest of that day.
+    if instance.pk is None and instance.date:
+        restore_before_write(instance.course_id, instance.date)
+
+
+# AttendanceSummary counts both tables, so archived rows that are deleted,
+# directly or through a student or course, are taken off too.
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=ArchivedAttendance)
+def remember_attendance_summary_key(sender, instance, **kwargs):
+    instance._summary_key = None
+    if instance.pk:
+        instance._summary_key = sender.objects.filter(pk=instance.pk).values_list(
+            'course_id', 'date', 'status'
+        ).first()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=ArchivedAttendance)
+def update_summary_on_save(sender, instance, created, **kwargs):
+    new_key = (instance.course_id, instance.date, instance.status)
+    old_key = None if created else getattr(instance, '_summary_key', None)
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        apply_delta(*old_key, -1)
+    apply_delta(*new_key, 1)
+
+
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=ArchivedAttendance)
+def update_summary_on_delete(sender, instance, **kwargs):
+    apply_delta(instance.course_id, instance.date, instance.status, -1)
+
+
+# Live attendance feed (see core.events).
+@receiver(post_save, sender=Attendance)
+def publish_attendance_on_save(sender, instance, created, **kwargs):
+    old_key = None if created else getattr(instance, '_summary_key', None)
+    if old_key is not None and old_key[:2] != (instance.course_id, instance.date):
+        publish_attendance_on_commit(old_key[0], old_key[1], [(instance.student_id, None)])
+    publish_attendance_on_commit(instance.course_id, instance.date, [(instance.student_id, instance.status)])
+
+
+@receiver(post_delete, sender=Attendance)
+def publish_attendance_on_delete(sender, instance, **kwargs):
+    publish_attendance_on_commit(instance.course_id, instance.date, [(instance.student_id, None)])
+
+
+# Cached timetables (see core.timetables): their slots carry course, lecturer,
+# department and level details, so a change to any of them drops the cache.
+def forget_cached_timetables(sender, instance, **kwargs):
+    forget_timetables_on_commit()
+
+
+for model in (Timetable, Course, Lecturer, Department, Level):
+    post_save.connect(forget_cached_timetables, sender=model, dispatch_uid=f'forget_timetables_{model.__name__}')
+    post_delete.connect(forget_cached_timetables, sender=model, dispatch_uid=f'forget_timetables_{model.__name__}')
+
+
+@receiver(post_save, sender=User)
+def forget_timetables_on_lecturer_rename(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.user_type != 'lecturer':
+        return
+    if update_fields and set(update_fields) <= ROSTER_IRRELEVANT_USER_FIELDS:
+        return
+    forget_timetables_on_commit()
+
+
+# Dashboard totals (see core.counters).
+COUNTER_NAMES = {
+    Student: 'students',
+    Lecturer: 'lecturers',
+    Course: 'courses',
+    Attendance: 'attendance',
+    # Deleted through the admin or cascades; archival itself moves rows with raw SQL.
+    ArchivedAttendance: 'attendance',
+    Admin: 'admins',
+}
+
+
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        increment_on_commit(COUNTER_NAMES[sender], 1)
+
+
+def count_deleted(sender, instance, **kwargs):
+    increment_on_commit(COUNTER_NAMES[sender], -1)
+
+
+for model in COUNTER_NAMES:
+    post_save.connect(count_created, sender=model, dispatch_uid=f'count_created_{model.__name__}')
+    post_delete.connect(count_deleted, sender=model, dispatch_uid=f'count_deleted_{model.__name__}')
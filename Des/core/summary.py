@@ -0,0 +1,124 @@
+"""Maintenance of the ``AttendanceSummary`` counts table, and attendance totals.
+
+Bulk writes refresh the (course, date) slice they touched with one small
+aggregate; single-row saves and deletes (admin, cascades, get_or_create)
+apply +1/-1 deltas from the signal handlers in ``core.signals``.
+"""
+import heapq
+from itertools import groupby
+
+from django.db.models import Count, F, Sum
+
+from .archive import attendance_models
+from .models import Attendance, AttendanceSummary, Course
+
+STATUSES = [status for status, label in Attendance.STATUS_CHOICES]
+
+
+def refresh_summary(course_id, day):
+    """Recount one course's attendance for one day.
+
+    Returns how many rows the slice gained since its summary was last
+    brought up to date (negative if it lost rows).
+    """
+    previous = AttendanceSummary.objects.filter(course_id=course_id, date=day).aggregate(total=Sum('count'))['total']
+    counts = dict(
+        Attendance.objects.filter(course_id=course_id, date=day)
+        .order_by()
+        .values_list('status')
+        .annotate(total=Count('id'))
+    )
+    AttendanceSummary.objects.bulk_create(
+        [
+            AttendanceSummary(course_id=course_id, date=day, status=status, count=counts.get(status, 0))
+            for status in STATUSES
+        ],
+        update_conflicts=True,
+        unique_fields=['course', 'date', 'status'],
+        update_fields=['count'],
+    )
+    return sum(counts.values()) - (previous or 0)
+
+
+def apply_delta(course_id, day, status, delta):
+    """Add ``delta`` to a single summary counter."""
+    updated = AttendanceSummary.objects.filter(course_id=course_id, date=day, status=status).update(
+        count=F('count') + delta
+    )
+    if not updated and delta > 0:
+        AttendanceSummary.objects.create(course_id=course_id, date=day, status=status, count=delta)
+
+
+def rebuild_summary(batch_size=2000):
+    """Recompute the whole summary table from ``Attendance`` and its archive; returns the row count."""
+    AttendanceSummary.objects.all().delete()
+    tables = [
+        model.objects.order_by('course_id', 'date', 'status')
+        .values_list('course_id', 'date', 'status')
+        .annotate(total=Count('id'))
+        .iterator(chunk_size=batch_size)
+        for model in attendance_models()
+    ]
+    batch = []
+    created = 0
+    for key, totals in groupby(heapq.merge(*tables), key=lambda row: row[:3]):
+        course_id, day, status = key
+        total = sum(row[3] for row in totals)
+        batch.append(AttendanceSummary(course_id=course_id, date=day, status=status, count=total))
+        if len(batch) >= batch_size:
+            AttendanceSummary.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    AttendanceSummary.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def summarize(summaries):
+    """Collapse a filtered ``AttendanceSummary`` queryset into headline totals."""
+    totals = dict(summaries.order_by().values_list('status').annotate(total=Sum('count')))
+    stats = {status: totals.get(status) or 0 for status in STATUSES}
+    stats['total'] = sum(stats.values())
+    return stats
+
+
+def add_percentages(stats):
+    """Add ``<status>_pct`` entries (share of ``total``, in percent) to a totals dict."""
+    total = stats['total']
+    for status in STATUSES:
+        stats[f'{status}_pct'] = round(100 * stats[status] / total, 1) if total else 0
+    return stats
+
+
+def student_breakdown(student_id):
+    """One student's attendance totals, overall and per course.
+
+    The counts come from one grouped query per table (the archive's only
+    once it holds rows) that only reads the student/course/status index;
+    the course names are fetched
+    afterwards for the few courses found. Returns ``(overall, courses)``:
+    ``overall`` is shaped like ``summarize``'s result and ``courses`` is a
+    list of the same per course (plus ``code`` and ``title``), ordered by
+    course code. Both carry percentages.
+    """
+    courses = {}
+    for model in attendance_models():
+        rows = (
+            model.objects.filter(student_id=student_id)
+            .order_by()
+            .values_list('course_id', 'status')
+            .annotate(total=Count('id'))
+        )
+        for course_id, status, total in rows:
+            # Like ``summarize``, only the statuses the app offers are counted.
+            if status not in STATUSES:
+                continue
+            courses.setdefault(course_id, dict.fromkeys(STATUSES, 0))[status] += total
+
+    overall = {status: sum(course[status] for course in courses.values()) for status in STATUSES}
+    overall['total'] = sum(overall.values())
+    names = Course.objects.only('code', 'title').in_bulk(courses)
+    for course_id, course in courses.items():
+        course.update(code=names[course_id].code, title=names[course_id].title)
+        course['total'] = sum(course[status] for status in STATUSES)
+        add_percentages(course)
+    return add_percentages(overall), sorted(courses.values(), key=lambda course: course['code'])
@@ -1,3 +1,148 @@
+import base64
+import json
+from datetime import date, timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+
+from core.archive import archive_attendance
+from core.bench import create_cohort
+from core.models import Attendance, ArchivedAttendance, AttendanceSummary, User
+from core.summary import summarize, student_breakdown
+
+
+class ArchivedAttendanceSummaryTests(TestCase):
+    """Deleting archived attendance takes it off the summary counts."""
+
+    def setUp(self):
+        self.course = create_cohort(3, 'ARC')
+        self.students = list(self.course.department.student_set.order_by('id'))
+        self.day = date.today() - timedelta(days=400)
+        for student in self.students:
+            Attendance.objects.create(
+                student=student, course=self.course, date=self.day, status='present', marked_by=self.course.lecturer
+            )
+        archive_attendance(date.today())
+
+    def counts(self):
+        return summarize(AttendanceSummary.objects.filter(course=self.course, date=self.day))
+
+    def test_archived_rows_are_counted(self):
+        self.assertEqual(ArchivedAttendance.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(self.counts()['present'], 3)
+
+    def test_deleting_an_archived_row(self):
+        ArchivedAttendance.objects.filter(student=self.students[0]).get().delete()
+        self.assertEqual(self.counts()['present'], 2)
+
+    def test_deleting_a_student_with_archived_rows(self):
+        self.students[1].delete()
+        self.assertEqual(self.counts()['present'], 2)
+
+    def test_deleting_a_course_with_archived_rows(self):
+        self.course.delete()
+        self.assertFalse(AttendanceSummary.objects.filter(date=self.day).exists())
+        self.assertFalse(ArchivedAttendance.objects.exists())
+
+
+class AttendanceReportCursorTests(TestCase):
+    """An edited ``after`` cursor falls back to the first page."""
+
+    def setUp(self):
+        self.course = create_cohort(2, 'CUR')
+        for student in self.course.department.student_set.all():
+            Attendance.objects.create(
+                student=student, course=self.course, date=date.today(), status='present', marked_by=self.course.lecturer
+            )
+        admin = User.objects.create_user('admin@cursor.edu', 'admin@cursor.edu', 'pass', user_type='admin')
+        self.client.force_login(admin)
+
+    def report(self, values):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        return self.client.get(reverse('attendance_reports'), {'after': cursor})
+
+    def test_valid_cursor(self):
+        response = self.report([str(date.today() + timedelta(days=1)), self.course.code, 0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['attendance_records']), 2)
+
+    def test_tampered_cursors(self):
+        for values in (['x', 1, 2], [str(date.today()), 'CS', 'x'], [None, 'CS', 1], ['2024-01-01', [], 2**70]):
+            with self.subTest(values=values):
+                response = self.report(values)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['attendance_records']), 2)
+
+
+class StudentBreakdownTests(TestCase):
+    """Attendance with a status the app does not offer is left out of the totals."""
+
+    def setUp(self):
+        self.course = create_cohort(1, 'BRK')
+        self.student = self.course.department.student_set.get()
+        for days, status in ((1, 'present'), (2, 'late'), (3, 'excused')):
+            Attendance.objects.create(
+                student=self.student, course=self.course, date=date.today() - timedelta(days=days),
+                status=status, marked_by=self.course.lecturer,
+            )
+
+    def test_unknown_status_is_skipped(self):
+        overall, courses = student_breakdown(self.student.id)
+        self.assertEqual((overall['total'], overall['present'], overall['late']), (2, 1, 1))
+        self.assertEqual([course['total'] for course in courses], [2])
+
+    def test_attendance_history_page(self):
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('attendance_history'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['total'], 2)
+
+
+class AdminPageTests(TestCase):
+    """The portal's admin pages resolve through the project URLconf."""
+
+    def setUp(self):
+        self.course = create_cohort(2, 'ADM')
+        for student in self.course.department.student_set.all():
+            Attendance.objects.create(
+                student=student, course=self.course, date=date.today(), status='absent', marked_by=self.course.lecturer
+            )
+        admin = User.objects.create_user('admin@pages.edu', 'admin@pages.edu', 'pass', user_type='admin')
+        self.client.force_login(admin)
+
+    def test_eligibility_report(self):
+        response = self.client.get(reverse('eligibility_report'), {'department': 'abc', 'date_from': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/eligibility_report.html')
+        self.assertEqual(response.context['ineligible'], 2)
+
+    def test_qr_card_export(self):
+        response = self.client.get(reverse('qr_card_export'), {'department': 'abc', 'level': '9' * 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/qr_cards.html')
+        self.assertEqual(response.context['student_count'], 2)
+        response = self.client.get(reverse('qr_card_export'), {'department': self.course.department_id})
+        self.assertEqual(response.context['student_count'], 2)
+        self.assertEqual(response.context['filters']['department_id'], str(self.course.department_id))
 
-# Create your tests here.
+    def test_student_import(self):
+        # Accounts whose username is not their email, as createsuperuser makes.
+        User.objects.create_user('root', 'root@pages.edu', 'pass', user_type='super_admin')
+        User.objects.create_user('ops', 'Ops@Pages.edu', 'pass', user_type='super_admin')
+        level = self.course.level.level_number
+        csv_file = SimpleUploadedFile('students.csv', (
+            'first_name,last_name,email,matric_number,department,level\n'
+            f'Ada,Obi,root@pages.edu,CS/20/0001,{self.course.department.code},{level}\n'
+            f'Ben,Eze,ben@pages.edu,CS/20/0002,{self.course.department.code},{level}\n'
+            f'Chi,Uba,ops@pages.edu,CS/20/0003,{self.course.department.code},{level}\n'
+        ).encode())
+        response = self.client.post(reverse('student_import'), {'file': csv_file})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/student_import.html')
+        report = response.context['report']
+        self.assertEqual((report.created, report.rejected), (1, 2))
+        self.assertEqual(report.errors, [
+            (2, 'root@pages.edu is already used by another account'),
+            (4, 'ops@pages.edu is already used by another account'),
+        ])
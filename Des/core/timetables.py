@@ -0,0 +1,101 @@
+"""Cached weekly timetables for the dashboards and the timetable page.
+
+The week of a department and level, and the week of a lecturer, are kept in
+Django's cache as fully resolved ``Slot`` tuples (course, lecturer name,
+department code and level number included), so pages render them without
+querying ``Timetable`` or following its relations.
+
+Timetables change about once a semester. Saving or deleting a timetable
+entry, course, lecturer, department or level, or renaming a lecturer, bumps
+a generation number that is part of every key (see ``core.signals``), which
+drops all cached weeks at once. Entries also expire after
+``TIMETABLE_CACHE_TTL`` seconds, which bounds how long bulk writes that send
+no signals, or changes made in other worker processes when the cache is not
+shared, can go unseen.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Timetable
+
+TIMETABLE_CACHE_TTL = getattr(settings, 'TIMETABLE_CACHE_TTL', 3600)
+
+GENERATION_KEY = 'timetable:generation'
+
+DAYS = [day for day, label in Timetable.DAY_CHOICES]
+
+Slot = namedtuple('Slot', [
+    'id', 'day', 'start_time', 'end_time',
+    'course_id', 'course_code', 'course_title', 'credit_units',
+    'lecturer_id', 'lecturer_name', 'department_code', 'level_number',
+])
+
+
+def group_query(department_id, level_id):
+    return Timetable.objects.filter(department_id=department_id, level_id=level_id)
+
+
+def lecturer_query(lecturer_id):
+    return Timetable.objects.filter(course__lecturer_id=lecturer_id)
+
+
+def resolve_slots(queryset):
+    """Read timetable entries as ``Slot`` tuples with one joined query, ordered Monday first."""
+    rows = queryset.order_by().values_list(
+        'id', 'day', 'start_time', 'end_time',
+        'course_id', 'course__code', 'course__title', 'course__credit_units',
+        'course__lecturer_id', 'course__lecturer__user__first_name', 'course__lecturer__user__last_name',
+        'department__code', 'level__level_number',
+    )
+    slots = []
+    for row in rows:
+        first_name, last_name = row[9:11]
+        slots.append(Slot(*row[:9], f'{first_name} {last_name}'.strip(), *row[11:]))
+    slots.sort(key=lambda slot: (DAYS.index(slot.day), slot.start_time))
+    return slots
+
+
+def _cached_week(name, queryset):
+    # The generation is read before the rows, so a week read during a change
+    # is stored under the generation the change then retires.
+    key = f'timetable:{cache.get_or_set(GENERATION_KEY, 1, None)}:{name}'
+    slots = cache.get(key)
+    if slots is None:
+        slots = resolve_slots(queryset)
+        cache.set(key, slots, TIMETABLE_CACHE_TTL)
+    return slots
+
+
+def group_week(department_id, level_id):
+    """The week of a department and level, as a list of ``Slot``."""
+    return _cached_week(f'group:{department_id}:{level_id}', group_query(department_id, level_id))
+
+
+def lecturer_week(lecturer_id):
+    """The week of every course a lecturer teaches, as a list of ``Slot``."""
+    return _cached_week(f'lecturer:{lecturer_id}', lecturer_query(lecturer_id))
+
+
+def on_day(slots, day):
+    return [slot for slot in slots if slot.day == day]
+
+
+def by_day(slots):
+    """``[(day, label, slots of that day)]`` for every day of the week."""
+    return [(day, label, on_day(slots, day)) for day, label in Timetable.DAY_CHOICES]
+
+
+def forget_timetables():
+    """Drop every cached week."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+
+
+def forget_timetables_on_commit():
+    """``forget_timetables`` once the current transaction commits, so no week is re-cached from old rows."""
+    transaction.on_commit(forget_timetables)
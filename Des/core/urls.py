@@ -25,6 +25,9 @@ urlpatterns = [
     path('lecturer/mark-attendance/<int:course_id>/', views.mark_attendance, name='mark_attendance'),
     path('lecturer/qr-scanner/<int:course_id>/', views.qr_scanner, name='qr_scanner'),
     path('lecturer/process-qr/<int:course_id>/', views.process_qr_scan, name='process_qr_scan'),
+    path('lecturer/process-qr/<int:course_id>/batch/', views.process_qr_scan_batch, name='process_qr_scan_batch'),
+    path('lecturer/attendance-stream/<int:course_id>/', views.attendance_stream, name='attendance_stream'),
+    path('lecturer/process-qr/<int:course_id>/photos/', views.process_qr_photos, name='process_qr_photos'),
     
     # Admin Management Views
     path('admin/manage/courses/', views.manage_courses, name='manage_courses'),
@@ -33,5 +36,11 @@ urlpatterns = [
     path('admin/manage/levels/', views.manage_levels, name='manage_levels'),
     path('admin/manage/lecturers/', views.manage_lecturers, name='manage_lecturers'),
     path('admin/manage/admins/', views.manage_admins, name='manage_admins'),
+    path('admin/manage/students/import/', views.student_import, name='student_import'),
     path('admin/reports/', views.attendance_reports, name='attendance_reports'),
+    path('admin/reports/eligibility/', views.eligibility_report, name='eligibility_report'),
+    path('admin/qr-cards/', views.qr_card_export, name='qr_card_export'),
+    
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
 ] 
\ No newline at end of file
@@ -2,14 +2,53 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.db import OperationalError
 from datetime import datetime, date
+import hmac
 import json
 
 from .models import *
 from .forms import *
+from .attendance import upsert_attendance, record_scans, MAX_SCAN_BATCH
+from .roster import roster_index
+from .summary import summarize, student_breakdown, STATUSES
+from .counters import get_counts
+from .pagination import KeysetPaginator
+from .archive import attendance_page, attendance_models
+from .exports import export_attendance, stream_csv, EXPORT_FORMATS
+from .eligibility import load_cohort, compute_eligibility, csv_rows, ELIGIBILITY_COLUMNS, ELIGIBILITY_THRESHOLD
+from .metrics import registry
+from .events import open_stream, stream_events, astream_events
+from .timetables import group_week, lecturer_week, on_day, by_day
+from .cards import export_qr_cards, CARD_FORMATS, CARDS_PER_SHEET
+from .photos import record_photo_scans, MAX_SCAN_PHOTOS, QR_PHOTO_MAX_BYTES
+from .importers import import_students, IMPORT_COLUMNS
+from .journal import journal_scans, SCAN_WRITE_MODE
+
+REPORT_PAGINATOR = KeysetPaginator(['-date', 'course__code', 'id'], page_size=50)
+HISTORY_PAGINATOR = KeysetPaginator(['-date', 'id'], page_size=50)
+RECENT_PAGINATOR = KeysetPaginator(['-date', 'id'], page_size=10)
+
+# Students listed on the eligibility page; the CSV export has them all.
+ELIGIBILITY_PAGE_ROWS = 500
+
+# SQLite result codes of a lock that could not be taken in time.
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+# Scans are written before they are answered, or with SCAN_WRITE_MODE =
+# 'journal' answered once journaled and written by flush_scan_journal.
+write_scans = journal_scans if SCAN_WRITE_MODE == 'journal' else record_scans
+
+# Scrapers read /metrics/ without logging in by sending this token as
+# "Authorization: Bearer <token>"; unset, only admins can read it.
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', None)
 
 def is_student(user):
     return user.is_authenticated and user.user_type == 'student'
@@ -23,6 +62,15 @@ def is_admin(user):
 def is_super_admin(user):
     return user.is_authenticated and user.user_type == 'super_admin'
 
+def can_view_metrics(request):
+    user = request.user
+    if user.is_authenticated and (user.is_superuser or user.user_type in ('admin', 'super_admin')):
+        return True
+    if not METRICS_TOKEN:
+        return False
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+
 def home(request):
     return render(request, 'core/home.html')
 
@@ -92,15 +140,13 @@ def logout_view(request):
 @login_required
 @user_passes_test(is_student)
 def student_dashboard(request):
-    student = request.user.student_profile
-    attendance_records = Attendance.objects.filter(student=student).order_by('-date')[:10]
+    student = Student.objects.select_related('user', 'department', 'level').get(user=request.user)
+    attendance_records, next_cursor = attendance_page(
+        RECENT_PAGINATOR, lambda model: model.objects.filter(student=student).select_related('course')
+    )
     
     today = timezone.now().strftime('%A').lower()
-    today_timetable = Timetable.objects.filter(
-        department=student.department,
-        level=student.level,
-        day=today
-    ).order_by('start_time')
+    today_timetable = on_day(group_week(student.department_id, student.level_id), today)
     
     context = {
         'student': student,
@@ -113,13 +159,10 @@ def student_dashboard(request):
 @user_passes_test(is_lecturer)
 def lecturer_dashboard(request):
     lecturer = request.user.lecturer_profile
-    courses = Course.objects.filter(lecturer=lecturer)
+    courses = Course.objects.filter(lecturer=lecturer).select_related('department', 'level')
     
     today = timezone.now().strftime('%A').lower()
-    today_courses = Timetable.objects.filter(
-        course__lecturer=lecturer,
-        day=today
-    ).order_by('start_time')
+    today_courses = on_day(lecturer_week(lecturer.id), today)
     
     context = {
         'lecturer': lecturer,
@@ -132,17 +175,14 @@ def lecturer_dashboard(request):
 @user_passes_test(is_admin)
 def admin_dashboard(request):
     admin = request.user.admin_profile
-    total_students = Student.objects.count()
-    total_lecturers = Lecturer.objects.count()
-    total_courses = Course.objects.count()
-    total_attendance = Attendance.objects.count()
+    counts = get_counts('students', 'lecturers', 'courses', 'attendance')
     
     context = {
         'admin': admin,
-        'total_students': total_students,
-        'total_lecturers': total_lecturers,
-        'total_courses': total_courses,
-        'total_attendance': total_attendance,
+        'total_students': counts['students'],
+        'total_lecturers': counts['lecturers'],
+        'total_courses': counts['courses'],
+        'total_attendance': counts['attendance'],
     }
     return render(request, 'core/admin_dashboard.html', context)
 
@@ -150,19 +190,15 @@ def admin_dashboard(request):
 @user_passes_test(is_super_admin)
 def super_admin_dashboard(request):
     admin = request.user.admin_profile
-    total_students = Student.objects.count()
-    total_lecturers = Lecturer.objects.count()
-    total_courses = Course.objects.count()
-    total_attendance = Attendance.objects.count()
-    total_admins = Admin.objects.count()
+    counts = get_counts()
     
     context = {
         'admin': admin,
-        'total_students': total_students,
-        'total_lecturers': total_lecturers,
-        'total_courses': total_courses,
-        'total_attendance': total_attendance,
-        'total_admins': total_admins,
+        'total_students': counts['students'],
+        'total_lecturers': counts['lecturers'],
+        'total_courses': counts['courses'],
+        'total_attendance': counts['attendance'],
+        'total_admins': counts['admins'],
     }
     return render(request, 'core/super_admin_dashboard.html', context)
 
@@ -170,32 +206,50 @@ def super_admin_dashboard(request):
 @user_passes_test(is_student)
 def student_qr_code(request):
     student = request.user.student_profile
+    student.ensure_qr_code()
     return render(request, 'core/student_qr_code.html', {'student': student})
 
 @login_required
 @user_passes_test(is_student)
 def attendance_history(request):
-    student = request.user.student_profile
-    attendance_records = Attendance.objects.filter(student=student).order_by('-date')
+    student = Student.objects.select_related('user', 'department', 'level').get(user=request.user)
+    
+    # Totals come from one grouped query; only a page of records is loaded,
+    # with its course and lecturer joined in.
+    overall, courses = student_breakdown(student.id)
+    def records(model):
+        return model.objects.filter(student=student).select_related(
+            'course', 'marked_by__user'
+        ).only(
+            'date', 'status', 'marked_at', 'course__code', 'course__title',
+            'marked_by__user__first_name', 'marked_by__user__last_name',
+        )
+    
+    # Past semesters are read from the archive once the pages reach them.
+    attendance_records, next_cursor = attendance_page(HISTORY_PAGINATOR, records, cursor=request.GET.get('after'))
     
     context = {
         'student': student,
         'attendance_records': attendance_records,
+        'stats': overall,
+        'course_stats': courses,
+        'next_page_query': f'after={next_cursor}' if next_cursor else None,
+        'is_first_page': not request.GET.get('after'),
     }
     return render(request, 'core/attendance_history.html', context)
 
 @login_required
 @user_passes_test(is_student)
 def timetable_view(request):
-    student = request.user.student_profile
-    timetable = Timetable.objects.filter(
-        department=student.department,
-        level=student.level
-    ).order_by('day', 'start_time')
+    student = Student.objects.select_related('user', 'department', 'level').get(user=request.user)
+    timetable = group_week(student.department_id, student.level_id)
     
     context = {
         'student': student,
         'timetable': timetable,
+        'days': by_day(timetable),
+        'course_count': len({slot.course_id for slot in timetable}),
+        'lecturer_count': len({slot.lecturer_id for slot in timetable}),
     }
     return render(request, 'core/timetable_view.html', context)
 
@@ -203,31 +257,20 @@ def timetable_view(request):
 @user_passes_test(is_lecturer)
 def mark_attendance(request, course_id):
     course = get_object_or_404(Course, id=course_id, lecturer=request.user.lecturer_profile)
-    students = Student.objects.filter(department=course.department, level=course.level)
+    students = Student.objects.filter(department=course.department, level=course.level).select_related('user')
     
     if request.method == 'POST':
         date_str = request.POST.get('date')
         attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else date.today()
         
-        for student in students:
-            status = request.POST.get(f'status_{student.id}', 'absent')
-            notes = request.POST.get(f'notes_{student.id}', '')
-            
-            attendance, created = Attendance.objects.get_or_create(
-                student=student,
-                course=course,
-                date=attendance_date,
-                defaults={
-                    'status': status,
-                    'marked_by': request.user.lecturer_profile,
-                    'notes': notes
-                }
-            )
-            
-            if not created:
-                attendance.status = status
-                attendance.notes = notes
-                attendance.save()
+        entries = []
+        for student_id in students.values_list('id', flat=True):
+            status = request.POST.get(f'status_{student_id}', 'absent')
+            # A status the form does not offer is recorded as absent.
+            if status not in STATUSES:
+                status = 'absent'
+            entries.append((student_id, status, request.POST.get(f'notes_{student_id}', '')))
+        upsert_attendance(course.id, attendance_date, request.user.lecturer_profile.id, entries)
         
         messages.success(request, f'Attendance marked successfully for {course.code}')
         return redirect('lecturer_dashboard')
@@ -245,62 +288,162 @@ def qr_scanner(request, course_id):
     course = get_object_or_404(Course, id=course_id, lecturer=request.user.lecturer_profile)
     return render(request, 'core/qr_scanner.html', {'course': course})
 
+@login_required
+@user_passes_test(is_lecturer)
+def attendance_stream(request, course_id):
+    """Server-sent events with the course's attendance for one day (see core.events)."""
+    course = get_object_or_404(Course, id=course_id, lecturer=request.user.lecturer_profile)
+    date_str = request.GET.get('date')
+    try:
+        attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else date.today()
+    except ValueError:
+        return HttpResponseBadRequest('date must be YYYY-MM-DD', content_type='text/plain')
+    
+    # EventSource sends the header when it reconnects; the query parameter
+    # lets a reloaded page resume too.
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    opening, cursor = open_stream(course.id, attendance_date, last_event_id)
+    
+    stream = astream_events if isinstance(request, ASGIRequest) else stream_events
+    response = StreamingHttpResponse(
+        stream(course.id, attendance_date, opening, cursor), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def resolve_scan_target(request, course_id):
+    """Return the cached roster of the course and the id of the marking lecturer."""
+    roster = roster_index.get(course_id)
+    if roster is None:
+        raise Http404('No Course matches the given query.')
+    
+    # The course's own lecturer is known from the roster, so the common
+    # case needs no profile lookup.
+    if request.user.is_authenticated and request.user.pk == roster.lecturer_user_id:
+        return roster, roster.lecturer_id
+    return roster, request.user.lecturer_profile.id
+
+def is_database_busy(error):
+    """Whether ``error`` is SQLite giving up waiting for a lock (SQLITE_BUSY or SQLITE_LOCKED)."""
+    if not isinstance(error, OperationalError):
+        return False
+    # The primary result code of the sqlite3 error (Python 3.11+).
+    code = getattr(error.__cause__, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    return 'is locked' in str(error)
+
+def database_busy():
+    """The answer to a scan whose write gave up waiting for the database.
+
+    Sent as 503 with Retry-After rather than as a failed scan, so the
+    scanner page sends the scan again instead of reporting the card as bad.
+    """
+    response = JsonResponse({
+        'success': False,
+        'retry': True,
+        'message': 'The database is busy, please scan again'
+    }, status=503)
+    response['Retry-After'] = '1'
+    return response
+
 @csrf_exempt
 def process_qr_scan(request, course_id):
     try:
         data = json.loads(request.body)
         qr_data = data.get('qr_data')
-        course = get_object_or_404(Course, id=course_id)
+        roster, marked_by_id = resolve_scan_target(request, course_id)
         
-        # Parse QR data (format: STUDENT:STUDENT_ID:MATRIC_NUMBER)
-        if qr_data.startswith('STUDENT:'):
-            parts = qr_data.split(':')
-            if len(parts) >= 3:
-                student_id = parts[1]
-                matric_number = parts[2]
-                
-                try:
-                    student = Student.objects.get(
-                        student_id=student_id,
-                        matric_number=matric_number,
-                        department=course.department,
-                        level=course.level
-                    )
-                    
-                    # Mark attendance
-                    attendance, created = Attendance.objects.get_or_create(
-                        student=student,
-                        course=course,
-                        date=date.today(),
-                        defaults={
-                            'status': 'present',
-                            'marked_by': request.user.lecturer_profile
-                        }
-                    )
-                    
-                    if not created:
-                        attendance.status = 'present'
-                        attendance.save()
-                    
-                    return JsonResponse({
-                        'success': True,
-                        'message': f'Attendance marked for {student.user.get_full_name()}',
-                        'student_name': student.user.get_full_name(),
-                        'matric_number': student.matric_number
-                    })
-                    
-                except Student.DoesNotExist:
-                    return JsonResponse({
-                        'success': False,
-                        'message': 'Student not found or not enrolled in this course'
-                    })
+        result = write_scans(roster, marked_by_id, [qr_data])[0]
+        return JsonResponse(result)
         
+    except Exception as e:
+        if is_database_busy(e):
+            return database_busy()
         return JsonResponse({
             'success': False,
-            'message': 'Invalid QR code format'
+            'message': str(e)
         })
+
+@csrf_exempt
+def process_qr_scan_batch(request, course_id):
+    try:
+        data = json.loads(request.body)
+        scans = data.get('scans')
         
+        if not isinstance(scans, list):
+            return JsonResponse({
+                'success': False,
+                'message': 'Expected "scans" to be a list of QR payloads'
+            })
+        if len(scans) > MAX_SCAN_BATCH:
+            return JsonResponse({
+                'success': False,
+                'message': f'A batch may contain at most {MAX_SCAN_BATCH} scans'
+            })
+        
+        roster, marked_by_id = resolve_scan_target(request, course_id)
+        results = write_scans(roster, marked_by_id, scans)
+        
+        return JsonResponse({
+            'success': True,
+            'marked': sum(1 for result in results if result['success']),
+            'results': results
+        })
+        
+    except Exception as e:
+        if is_database_busy(e):
+            return database_busy()
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        })
+
+@login_required
+@user_passes_test(is_lecturer)
+def process_qr_photos(request, course_id):
+    """Mark every student whose QR card shows in the uploaded classroom photos (see core.photos)."""
+    try:
+        if request.method != 'POST':
+            return JsonResponse({'success': False, 'message': 'Upload the photos with a POST request'})
+        
+        uploads = request.FILES.getlist('photos')
+        if not uploads:
+            return JsonResponse({'success': False, 'message': 'Choose at least one photo'})
+        if len(uploads) > MAX_SCAN_PHOTOS:
+            return JsonResponse({
+                'success': False,
+                'message': f'Upload at most {MAX_SCAN_PHOTOS} photos at a time'
+            })
+        for upload in uploads:
+            if upload.size > QR_PHOTO_MAX_BYTES:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'{upload.name} is larger than {QR_PHOTO_MAX_BYTES // (1024 * 1024)} MB'
+                })
+        
+        roster, marked_by_id = resolve_scan_target(request, course_id)
+        codes, results = record_photo_scans(roster, marked_by_id, [upload.read() for upload in uploads])
+        
+        return JsonResponse({
+            'success': True,
+            'marked': sum(1 for result in results if result['success']),
+            'photos': [
+                {'name': upload.name, 'readable': found is not None, 'codes': len(found or ())}
+                for upload, found in zip(uploads, codes)
+            ],
+            'results': results
+        })
+        
+    except ImportError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Reading photos needs the zbar library, which is not installed on the server'
+        })
     except Exception as e:
+        if is_database_busy(e):
+            return database_busy()
         return JsonResponse({
             'success': False,
             'message': str(e)
@@ -402,6 +545,34 @@ def manage_lecturers(request):
     }
     return render(request, 'core/manage_lecturers.html', context)
 
+@login_required
+@user_passes_test(lambda u: is_admin(u) or is_super_admin(u))
+def student_import(request):
+    """Bulk import students from an uploaded CSV (see core.importers)."""
+    report = None
+    if request.method == 'POST':
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = import_students(form.cleaned_data['file'], form.cleaned_data['password'])
+            except ValueError as e:
+                form.add_error('file', str(e))
+            else:
+                messages.success(
+                    request,
+                    f'Imported {report.created} students in {report.elapsed:.1f}s ({report.rate:,.0f} rows/s)'
+                )
+    else:
+        form = StudentImportForm()
+    
+    context = {
+        'form': form,
+        'report': report,
+        'columns': IMPORT_COLUMNS,
+        'unreported': report.rejected - len(report.errors) if report else 0,
+    }
+    return render(request, 'core/student_import.html', context)
+
 @login_required
 @user_passes_test(is_super_admin)
 def manage_admins(request):
@@ -420,20 +591,51 @@ def attendance_reports(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
-    attendance_records = Attendance.objects.all()
-    
+    # The same filters apply to the attendance tables and the summary counts.
+    filters = {}
     if department_id:
-        attendance_records = attendance_records.filter(course__department_id=department_id)
+        filters['course__department_id'] = department_id
     if level_id:
-        attendance_records = attendance_records.filter(course__level_id=level_id)
+        filters['course__level_id'] = level_id
     if course_id:
-        attendance_records = attendance_records.filter(course_id=course_id)
+        filters['course_id'] = course_id
     if date_from:
-        attendance_records = attendance_records.filter(date__gte=date_from)
+        filters['date__gte'] = date_from
     if date_to:
-        attendance_records = attendance_records.filter(date__lte=date_to)
+        filters['date__lte'] = date_to
+    summaries = AttendanceSummary.objects.filter(**filters)
+    
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        # Past semesters are only read when the range reaches the archive.
+        querysets = [model.objects.filter(**filters) for model in attendance_models(date_from)]
+        return export_attendance(querysets, export_format)
+    
+    def records(model):
+        # Only the columns the table shows, with every relation joined in.
+        return model.objects.filter(**filters).select_related(
+            'student__user', 'student__department', 'course', 'marked_by__user'
+        ).only(
+            'date', 'status', 'marked_at',
+            'student__matric_number', 'student__user__first_name', 'student__user__last_name',
+            'student__department__code', 'course__code', 'course__title',
+            'marked_by__user__first_name', 'marked_by__user__last_name',
+        )
+    
+    attendance_records, next_cursor = attendance_page(
+        REPORT_PAGINATOR, records, date_from, request.GET.get('after')
+    )
     
-    attendance_records = attendance_records.order_by('-date', 'course__code')
+    next_page_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['after'] = next_cursor
+        next_page_query = query.urlencode()
+    first_page_query = None
+    if request.GET.get('after'):
+        query = request.GET.copy()
+        del query['after']
+        first_page_query = query.urlencode()
     
     departments = Department.objects.all()
     levels = Level.objects.all()
@@ -441,6 +643,9 @@ def attendance_reports(request):
     
     context = {
         'attendance_records': attendance_records,
+        'stats': summarize(summaries),
+        'next_page_query': next_page_query,
+        'first_page_query': first_page_query,
         'departments': departments,
         'levels': levels,
         'courses': courses,
@@ -453,3 +658,116 @@ def attendance_reports(request):
         }
     }
     return render(request, 'core/attendance_reports.html', context)
+
+def query_id(request, name):
+    """A primary key query parameter, or None when it is missing or not one."""
+    try:
+        value = int(request.GET.get(name, ''))
+    except ValueError:
+        return None
+    # Keys are positive 64-bit integers.
+    return value if 0 < value < 2 ** 63 else None
+
+def query_date(request, name):
+    """A YYYY-MM-DD query parameter, or None when it is missing or not a real date."""
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+@login_required
+@user_passes_test(lambda u: is_admin(u) or is_super_admin(u))
+def eligibility_report(request):
+    # Malformed filters are ignored rather than passed to the queries.
+    department_id = query_id(request, 'department')
+    level_id = query_id(request, 'level')
+    course_id = query_id(request, 'course')
+    date_from = query_date(request, 'date_from')
+    date_to = query_date(request, 'date_to')
+    show_all = request.GET.get('show') == 'all'
+    try:
+        threshold = float(request.GET.get('threshold', ELIGIBILITY_THRESHOLD))
+    except ValueError:
+        threshold = ELIGIBILITY_THRESHOLD
+    if not 0 <= threshold <= 100:
+        threshold = ELIGIBILITY_THRESHOLD
+    
+    courses = Course.objects.all()
+    if department_id:
+        courses = courses.filter(department_id=department_id)
+    if level_id:
+        courses = courses.filter(level_id=level_id)
+    if course_id:
+        courses = courses.filter(id=course_id)
+    
+    # The whole cohort is computed at once from columnar arrays (see core/eligibility.py).
+    report = compute_eligibility(load_cohort(courses, date_from, date_to), threshold)
+    
+    if request.GET.get('export') == 'csv':
+        rows = csv_rows(report.rows(ineligible_only=not show_all))
+        response = StreamingHttpResponse(stream_csv(rows, columns=ELIGIBILITY_COLUMNS), content_type='text/csv')
+        stamp = timezone.localdate().strftime('%Y%m%d')
+        response['Content-Disposition'] = f'attachment; filename="eligibility_report_{stamp}.csv"'
+        return response
+    
+    rows = report.rows(ineligible_only=not show_all, limit=ELIGIBILITY_PAGE_ROWS)
+    export_query = request.GET.copy()
+    export_query['export'] = 'csv'
+    
+    context = {
+        'rows': rows,
+        'listed_total': report.ineligible_count if not show_all else len(report),
+        'course_totals': report.course_totals(),
+        'assessed': len(report),
+        'ineligible': report.ineligible_count,
+        'threshold': threshold,
+        'show_all': show_all,
+        'export_query': export_query.urlencode(),
+        'departments': Department.objects.all(),
+        'levels': Level.objects.all(),
+        'courses': Course.objects.all(),
+        'filters': {
+            'department_id': str(department_id or ''),
+            'level_id': str(level_id or ''),
+            'course_id': str(course_id or ''),
+            'date_from': date_from.isoformat() if date_from else '',
+            'date_to': date_to.isoformat() if date_to else '',
+        }
+    }
+    return render(request, 'core/eligibility_report.html', context)
+
+@login_required
+@user_passes_test(lambda u: is_admin(u) or is_super_admin(u))
+def qr_card_export(request):
+    # Malformed filters are ignored rather than passed to the queries.
+    department_id = query_id(request, 'department')
+    level_id = query_id(request, 'level')
+    
+    students = Student.objects.all()
+    if department_id:
+        students = students.filter(department_id=department_id)
+    if level_id:
+        students = students.filter(level_id=level_id)
+    
+    # Cards are rendered in worker processes and streamed (see core/cards.py).
+    export_format = request.GET.get('format')
+    if export_format in CARD_FORMATS:
+        return export_qr_cards(students, export_format)
+    
+    student_count = students.count()
+    context = {
+        'student_count': student_count,
+        'sheet_count': -(-student_count // CARDS_PER_SHEET),
+        'departments': Department.objects.all(),
+        'levels': Level.objects.all(),
+        'filters': {
+            'department_id': str(department_id or ''),
+            'level_id': str(level_id or ''),
+        }
+    }
+    return render(request, 'core/qr_cards.html', context)
+
+def metrics(request):
+    if not can_view_metrics(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')